@@ -10,20 +10,29 @@ import sys
 import json
 import time
 import hashlib
+import re
+import subprocess
 import traceback
 import logging
-from typing import Dict, List, Any, Optional, Union
+import asyncio
+from typing import Dict, List, Any, Optional, AsyncIterator
 from datetime import datetime
+from contextlib import asynccontextmanager
 
 # Core dependencies only
 from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 import uvicorn
-import requests
+import httpx
 
 # Import base tool classes
-from claude_tools_base import ToolExecutionMixin
+from claude_tools_base import (
+    ToolExecutionMixin, ORJSONResponse, next_id, run_shell_command,
+    json_dumps, json_loads, sse_event, text_delta
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -37,6 +46,7 @@ CEREBRAS_API_KEY = os.getenv('CEREBRAS_API_KEY')
 CEREBRAS_BASE_URL = "https://api.cerebras.ai/v1"
 DEFAULT_MODEL = "qwen-3-coder-480b"
 API_PORT = int(os.getenv('PORT', 8002))
+WEB_WORKERS = int(os.getenv('WEB_WORKERS', 4))
 
 if not CEREBRAS_API_KEY:
     logger.error("❌ CEREBRAS_API_KEY environment variable not set")
@@ -54,35 +64,36 @@ class CerebrasToolsProxy(ToolExecutionMixin):
         super().__init__()
         logger.info(f"🧠 Cerebras Tools Proxy initialized with session: {self.tools.session_id}")
 
+# Blocked bash substrings, compiled into one case-insensitive alternation
+DANGEROUS_COMMANDS = [
+    'rm -rf /', 'rm -rf *', 'format', 'fdisk', 'mkfs',
+    'dd if=', ':(){ :|:& };:', 'chmod -R 777 /',
+    'chown -R', 'passwd', 'sudo su', 'su -',
+    'curl http://169.254.169.254'  # Block metadata access
+]
+DANGEROUS_COMMAND_RE = re.compile("|".join(map(re.escape, DANGEROUS_COMMANDS)), re.IGNORECASE)
+
 # Legacy class name for compatibility
 class ClaudeCodeTools:
     """Implements Claude Code's core tools with Cerebras compatibility"""
     
     def __init__(self):
         self.temp_files = {}
-        self.session_id = str(uuid.uuid4())
+        self.session_id = next_id("s")
         logger.info(f"🔧 Tools session: {self.session_id}")
         
     def bash(self, command: str) -> Dict[str, Any]:
         """Execute bash commands with security checks"""
         
         # Security checks
-        dangerous_commands = [
-            'rm -rf /', 'rm -rf *', 'format', 'fdisk', 'mkfs',
-            'dd if=', ':(){ :|:& };:', 'chmod -R 777 /',
-            'chown -R', 'passwd', 'sudo su', 'su -',
-            'curl http://169.254.169.254'  # Block metadata access
-        ]
-        
-        command_lower = command.lower()
-        for dangerous in dangerous_commands:
-            if dangerous in command_lower:
-                return {
-                    "type": "bash",
-                    "exit_code": 1,
-                    "stdout": "",
-                    "stderr": f"Security: Dangerous command blocked: {dangerous}"
-                }
+        match = DANGEROUS_COMMAND_RE.search(command)
+        if match:
+            return {
+                "type": "bash",
+                "exit_code": 1,
+                "stdout": "",
+                "stderr": f"Security: Dangerous command blocked: {match.group(0)}"
+            }
         
         try:
             logger.info(f"🔧 Executing bash: {command}")
@@ -96,23 +107,16 @@ class ClaudeCodeTools:
                     "stderr": "Command too long (max 1000 characters)"
                 }
             
-            result = subprocess.run(
-                command,
-                shell=True,
-                capture_output=True,
-                text=True,
-                timeout=30,
-                cwd=os.getcwd(),
-                env=dict(os.environ, PATH=os.environ.get('PATH', ''))
-            )
+            # Own process group, so a timeout kills the command's children too
+            exit_code, stdout, stderr = run_shell_command(command)
             
-            logger.info(f"✅ Bash result: exit_code={result.returncode}")
+            logger.info(f"✅ Bash result: exit_code={exit_code}")
             
             return {
                 "type": "bash",
-                "exit_code": result.returncode,
-                "stdout": result.stdout,
-                "stderr": result.stderr
+                "exit_code": exit_code,
+                "stdout": stdout,
+                "stderr": stderr
             }
         except subprocess.TimeoutExpired:
             return {
@@ -218,11 +222,11 @@ class ClaudeCodeTools:
                 "error": f"Failed to write file: {str(e)}"
             }
 
-def retry_with_backoff(func, max_retries=3, base_delay=1.0):
-    """Retry function with exponential backoff for rate limiting"""
+async def retry_with_backoff(func, max_retries=3, base_delay=1.0):
+    """Retry an async request with exponential backoff for rate limiting"""
     for attempt in range(max_retries + 1):
         try:
-            response = func()
+            response = await func()
             
             # If we get a 429 (rate limit), handle it specially
             if response.status_code == 429:
@@ -238,7 +242,8 @@ def retry_with_backoff(func, max_retries=3, base_delay=1.0):
                     delay = base_delay * (2 ** attempt)
                 
                 logger.info(f"Rate limited, retrying in {delay:.2f}s (attempt {attempt + 1}/{max_retries + 1})")
-                time.sleep(delay)
+                await response.aclose()
+                await asyncio.sleep(delay)
                 continue
             
             return response
@@ -250,12 +255,31 @@ def retry_with_backoff(func, max_retries=3, base_delay=1.0):
             
             delay = base_delay * (2 ** attempt)
             logger.warning(f"Request failed, retrying in {delay:.2f}s: {e}")
-            time.sleep(delay)
+            await asyncio.sleep(delay)
     
     return None
 
+# Shared async client for the Cerebras API: keep-alive TLS connections are
+# reused across requests and the event loop stays free during generation
+http_client = httpx.AsyncClient(
+    base_url=CEREBRAS_BASE_URL,
+    headers={"Authorization": f"Bearer {CEREBRAS_API_KEY}"},
+    timeout=60,
+    limits=httpx.Limits(max_connections=64, max_keepalive_connections=32)
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await http_client.aclose()
+
 # Initialize FastAPI app
-app = FastAPI(title="Tool-Enabled Cerebras Proxy", version="1.0.0")
+app = FastAPI(
+    title="Tool-Enabled Cerebras Proxy",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
+)
 
 # Add CORS middleware
 app.add_middleware(
@@ -265,6 +289,9 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Compress large JSON bodies; Starlette >= 0.46 (see requirements.txt)
+# leaves text/event-stream untouched
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=1)
 
 # Initialize tools
 proxy = CerebrasToolsProxy()
@@ -275,8 +302,81 @@ def should_use_tools(content: str) -> bool:
 def extract_tool_requests(content: str) -> List[Dict]:
     return proxy.extract_tool_requests(content)
 
-def execute_tools(tool_requests: List[Dict]) -> str:
-    return proxy.execute_tools(tool_requests)
+async def execute_tools(tool_requests: List[Dict]) -> str:
+    # Tools block (subprocess, file I/O); keep them off the event loop
+    return await proxy.aexecute_tools(tool_requests)
+
+async def stream_cerebras_response(response: httpx.Response) -> AsyncIterator[str]:
+    """Relay a streamed Cerebras completion as Anthropic stream events
+    
+    Tool detection runs on the accumulated text after the final chunk and
+    tool output is sent as a trailing text delta.
+    """
+    yield sse_event("message_start", {
+        "type": "message_start",
+        "message": {
+            "id": next_id("msg_"),
+            "type": "message",
+            "role": "assistant",
+            "content": [],
+            "model": "claude-3-5-sonnet-20241022",
+            "stop_reason": None,
+            "stop_sequence": None,
+            "usage": {"input_tokens": 0, "output_tokens": 0}
+        }
+    })
+    yield sse_event("content_block_start", {
+        "type": "content_block_start",
+        "index": 0,
+        "content_block": {"type": "text", "text": ""}
+    })
+    
+    parts = []
+    usage = {}
+    try:
+        async for line in response.aiter_lines():
+            if not line.startswith("data: "):
+                continue
+            data = line[6:].strip()
+            if data == "[DONE]":
+                break
+            try:
+                chunk = json_loads(data)
+            except json.JSONDecodeError:
+                logger.warning(f"Failed to parse streaming chunk: {data[:200]}")
+                continue
+            
+            usage = chunk.get("usage") or usage
+            choices = chunk.get("choices") or [{}]
+            text = choices[0].get("delta", {}).get("content")
+            if text:
+                parts.append(text)
+                yield text_delta(text)
+    except httpx.HTTPError as e:
+        logger.error(f"❌ Cerebras stream failed: {e}")
+        yield sse_event("error", {
+            "type": "error",
+            "error": {"type": "api_error", "message": f"Cerebras service unavailable: {str(e)}"}
+        })
+        return
+    finally:
+        await response.aclose()
+    
+    content = "".join(parts)
+    tool_requests = proxy.detect_and_extract_tools(content)
+    if tool_requests:
+        logger.info("🔧 Tool execution triggered")
+        yield text_delta(await execute_tools(tool_requests))
+        logger.info(f"✅ Tools executed: {len(tool_requests)} operations")
+    
+    logger.info(f"✅ Stream complete ({len(content)} chars)")
+    yield sse_event("content_block_stop", {"type": "content_block_stop", "index": 0})
+    yield sse_event("message_delta", {
+        "type": "message_delta",
+        "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+        "usage": {"output_tokens": usage.get("completion_tokens", 0)}
+    })
+    yield sse_event("message_stop", {"type": "message_stop"})
 
 @app.get("/health")
 async def health_check():
@@ -285,11 +385,7 @@ async def health_check():
     # Check Cerebras API connection
     cerebras_status = "unknown"
     try:
-        response = requests.get(
-            f"{CEREBRAS_BASE_URL}/models",
-            headers={"Authorization": f"Bearer {CEREBRAS_API_KEY}"},
-            timeout=5
-        )
+        response = await http_client.get("/models", timeout=5)
         if response.status_code in [200, 429]:  # 429 is OK, just rate limited
             cerebras_status = "healthy"
         else:
@@ -297,7 +393,7 @@ async def health_check():
     except Exception as e:
         cerebras_status = f"unreachable"
     
-    return JSONResponse({
+    return ORJSONResponse({
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
         "cerebras_tools_proxy": "active",
@@ -313,61 +409,50 @@ async def health_check():
         }
     })
 
+# Served when the backend model list is unavailable; encoded once at import
+FALLBACK_MODELS_BODY = json_dumps({
+    "object": "list",
+    "data": [
+        {
+            "id": "claude-3-5-sonnet-20241022",
+            "object": "model",
+            "created": int(time.time()),
+            "owned_by": "anthropic",
+            "type": "text"
+        },
+        {
+            "id": DEFAULT_MODEL,
+            "object": "model",
+            "created": int(time.time()),
+            "owned_by": "cerebras",
+            "type": "text"
+        }
+    ]
+}).encode()
+
 @app.get("/v1/models")
 async def list_models():
     """List available models"""
     try:
-        response = requests.get(
-            f"{CEREBRAS_BASE_URL}/models",
-            headers={"Authorization": f"Bearer {CEREBRAS_API_KEY}"},
-            timeout=10
-        )
+        response = await http_client.get("/models", timeout=10)
         
         if response.status_code == 200:
-            return JSONResponse(response.json())
+            # Relay the upstream JSON bytes as-is
+            return Response(content=response.content, media_type="application/json")
         else:
             # Return fallback model list
-            return JSONResponse({
-                "object": "list",
-                "data": [
-                    {
-                        "id": "claude-3-5-sonnet-20241022",
-                        "object": "model",
-                        "created": int(time.time()),
-                        "owned_by": "anthropic",
-                        "type": "text"
-                    },
-                    {
-                        "id": DEFAULT_MODEL,
-                        "object": "model", 
-                        "created": int(time.time()),
-                        "owned_by": "cerebras",
-                        "type": "text"
-                    }
-                ]
-            })
+            return Response(content=FALLBACK_MODELS_BODY, media_type="application/json")
             
     except Exception as e:
         logger.error(f"Failed to get models: {e}")
-        # Return basic model list as fallback
-        return JSONResponse({
-            "object": "list",
-            "data": [
-                {
-                    "id": "claude-3-5-sonnet-20241022",
-                    "object": "model",
-                    "created": int(time.time()),
-                    "owned_by": "anthropic",
-                    "type": "text"
-                }
-            ]
-        })
+        # Return fallback model list
+        return Response(content=FALLBACK_MODELS_BODY, media_type="application/json")
 
 @app.post("/v1/messages")
 async def create_message(request: Request):
     """Create message with tool execution support"""
     try:
-        request_data = await request.json()
+        request_data = json_loads(await request.body())
         messages = request_data.get("messages", [])
         
         logger.info(f"📨 Request: {len(messages)} messages")
@@ -405,19 +490,39 @@ You have access to bash execution and file operations."""
             
             logger.info(f"🔄 Forwarding to Cerebras: {CEREBRAS_BASE_URL}")
             
+            if request_data.get("stream"):
+                # Retry only covers getting the stream started (429s etc.)
+                def open_stream():
+                    return http_client.send(
+                        http_client.build_request(
+                            "POST", "/chat/completions",
+                            json={**cerebras_request, "stream": True}
+                        ),
+                        stream=True
+                    )
+                
+                response = await retry_with_backoff(open_stream)
+                if not response:
+                    raise HTTPException(status_code=500, detail="No response from Cerebras API")
+                if response.status_code != 200:
+                    detail = (await response.aread()).decode(errors="replace")
+                    await response.aclose()
+                    logger.error(f"Cerebras API error: {response.status_code}")
+                    raise HTTPException(status_code=response.status_code, detail=detail)
+                # The generator closes the upstream response when it runs to the
+                # end; the background task also covers a body that never starts
+                return StreamingResponse(
+                    stream_cerebras_response(response),
+                    media_type="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+                    background=BackgroundTask(response.aclose)
+                )
+            
             # Make request with retry logic
             def make_request():
-                return requests.post(
-                    f"{CEREBRAS_BASE_URL}/chat/completions",
-                    headers={
-                        "Content-Type": "application/json",
-                        "Authorization": f"Bearer {CEREBRAS_API_KEY}"
-                    },
-                    json=cerebras_request,
-                    timeout=60
-                )
+                return http_client.post("/chat/completions", json=cerebras_request)
             
-            response = retry_with_backoff(make_request)
+            response = await retry_with_backoff(make_request)
             
             if not response or response.status_code != 200:
                 logger.error(f"Cerebras API error: {response.status_code if response else 'No response'}")
@@ -426,7 +531,7 @@ You have access to bash execution and file operations."""
                     detail=response.text if response else "No response from Cerebras API"
                 )
             
-            cerebras_response = response.json()
+            cerebras_response = json_loads(response.content)
             
             # Convert to Anthropic format
             content = cerebras_response["choices"][0]["message"]["content"]
@@ -456,7 +561,7 @@ You have access to bash execution and file operations."""
                 # Extract and execute tools
                 tool_requests = extract_tool_requests(content)
                 if tool_requests:
-                    tool_results = execute_tools(tool_requests)
+                    tool_results = await execute_tools(tool_requests)
                     
                     # Enhance response with tool results
                     enhanced_content = content + tool_results
@@ -464,9 +569,9 @@ You have access to bash execution and file operations."""
                     logger.info(f"✅ Tools executed: {len(tool_requests)} operations")
             
             logger.info(f"✅ Response ready ({len(content)} chars)")
-            return JSONResponse(anthropic_response)
+            return ORJSONResponse(anthropic_response)
             
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"❌ Cerebras request failed: {e}")
             raise HTTPException(status_code=503, detail=f"Cerebras service unavailable: {str(e)}")
             
@@ -485,4 +590,13 @@ if __name__ == "__main__":
     logger.info("\nReady for Claude Code CLI integration!")
     logger.info("=" * 40)
     
-    uvicorn.run(app, host="0.0.0.0", port=API_PORT)
\ No newline at end of file
+    # Import string so each worker process builds its own app, client and tools session
+    uvicorn.run(
+        "cerebras_tools_proxy:app",
+        host="0.0.0.0",
+        port=API_PORT,
+        workers=WEB_WORKERS,
+        backlog=2048,
+        loop="uvloop" if sys.platform != "win32" else "auto",
+        http="httptools"
+    )
\ No newline at end of file
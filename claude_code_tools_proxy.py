@@ -5,8 +5,8 @@ Implements Claude Code's tool protocol with actual tool execution
 """
 
 import os
-import json
 import subprocess
+import itertools
 import tempfile
 import uuid
 import time
@@ -22,10 +22,88 @@ logger = logging.getLogger(__name__)
 
 
 # Use system HTTP server - no external dependencies
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 from urllib.parse import urlparse, parse_qs
+import urllib.request
+import urllib.error
 import threading
 import socket
+from concurrent.futures import ThreadPoolExecutor
+
+from claude_tools_base import is_read_only_command, json_bytes, json_loads
+
+# Optional Aho-Corasick automaton for the command blocklist
+try:
+    import ahocorasick
+    HAS_AHOCORASICK = True
+except ImportError:
+    HAS_AHOCORASICK = False
+
+# Literal substrings blocked in bash commands (matched case-insensitively)
+DANGEROUS_COMMANDS = (
+    'rm -rf /', 'rm -rf *', 'format', 'fdisk', 'mkfs',
+    'dd if=', ':(){ :|:& };:', 'chmod -R 777 /',
+    'chown -R', 'passwd', 'sudo su', 'su -'
+)
+
+if HAS_AHOCORASICK:
+    _DANGER_AUTOMATON = ahocorasick.Automaton()
+    for _dangerous in DANGEROUS_COMMANDS:
+        _DANGER_AUTOMATON.add_word(_dangerous.lower(), _dangerous)
+    _DANGER_AUTOMATON.make_automaton()
+
+def find_dangerous_command(command: str) -> Optional[str]:
+    """Return the first blocklisted substring found in command, if any"""
+    command_lower = command.lower()
+    if HAS_AHOCORASICK:
+        # Single pass over the command for every blocked literal
+        for _, dangerous in _DANGER_AUTOMATON.iter(command_lower):
+            return dangerous
+        return None
+    for dangerous in DANGEROUS_COMMANDS:
+        if dangerous.lower() in command_lower:
+            return dangerous
+    return None
+
+# Pre-encoded bodies for the polling endpoints
+HEALTH_BODY_TEMPLATE = (
+    b'{"status":"healthy","claude_code_proxy":"active",'
+    b'"tools_enabled":true,"timestamp":"%s"}'
+)
+MODELS_BODY = json_bytes({
+    "object": "list",
+    "data": [
+        {
+            "id": "claude-3-5-sonnet-20241022",
+            "object": "model",
+            "created": int(time.time()),
+            "owned_by": "anthropic",
+            "type": "text"
+        }
+    ]
+})
+
+# Fenced bash blocks in model responses
+BASH_BLOCK_RE = re.compile(r'```bash\n(.*?)\n```', re.DOTALL)
+
+# Patterns that indicate tool usage, fused into one alternation so a
+# response is scanned once
+TOOL_TRIGGER_PATTERNS = [
+    r'```bash\n(.*?)\n```',
+    r'I\'ll (run|execute|create|write|edit)',
+    r'Let me (run|execute|create|write|edit)',
+]
+TOOL_TRIGGER_RE = re.compile(
+    "|".join(f"(?:{pattern})" for pattern in TOOL_TRIGGER_PATTERNS),
+    re.DOTALL | re.IGNORECASE
+)
+
+# Inline tool-call tags in incoming messages
+TOOL_CALL_RE = re.compile(r'<(?:bash|str_replace_editor)>')
+
+# Bash blocks run sequentially unless every one is a read-only command
+# (see is_read_only_command), since later blocks often depend on earlier ones
+MAX_PARALLEL_COMMANDS = 8
 
 class ClaudeCodeTools:
     """Implements Claude Code's core tools"""
@@ -33,26 +111,24 @@ class ClaudeCodeTools:
     def __init__(self):
         self.temp_files = {}
         self.session_id = str(uuid.uuid4())
+        self.refresh_env()
+    
+    def refresh_env(self):
+        """Snapshot the environment passed to bash subprocesses"""
+        self._subproc_env = dict(os.environ, PATH=os.environ.get('PATH', ''))
         
     def bash(self, command: str) -> Dict[str, Any]:
         """Execute bash commands like Claude Code's bash tool with security checks"""
         
         # Security checks
-        dangerous_commands = [
-            'rm -rf /', 'rm -rf *', 'format', 'fdisk', 'mkfs',
-            'dd if=', ':(){ :|:& };:', 'chmod -R 777 /',
-            'chown -R', 'passwd', 'sudo su', 'su -'
-        ]
-        
-        command_lower = command.lower()
-        for dangerous in dangerous_commands:
-            if dangerous in command_lower:
-                return {
-                    "type": "bash",
-                    "exit_code": 1,
-                    "stdout": "",
-                    "stderr": f"Security: Dangerous command blocked: {dangerous}"
-                }
+        dangerous = find_dangerous_command(command)
+        if dangerous:
+            return {
+                "type": "bash",
+                "exit_code": 1,
+                "stdout": "",
+                "stderr": f"Security: Dangerous command blocked: {dangerous}"
+            }
         
         try:
             logger.info(f"🔧 Executing bash: {command}")
@@ -72,8 +148,7 @@ class ClaudeCodeTools:
                 capture_output=True,
                 text=True,
                 timeout=30,
-                cwd=os.getcwd(),
-                env=dict(os.environ, PATH=os.environ.get('PATH', ''))
+                env=self._subproc_env
             )
             
             return {
@@ -119,12 +194,14 @@ class ClaudeCodeTools:
         elif command == "view":
             try:
                 with open(path, 'r') as f:
-                    content = f.read()
-                
-                if view_range:
-                    lines = content.split('\n')
-                    start, end = view_range
-                    content = '\n'.join(lines[start-1:end])
+                    if view_range:
+                        # Only materialize the requested window of lines
+                        start, end = view_range
+                        content = ''.join(itertools.islice(f, start-1, end))
+                        if content.endswith('\n'):
+                            content = content[:-1]
+                    else:
+                        content = f.read()
                 
                 return {
                     "type": "str_replace_editor",
@@ -141,13 +218,15 @@ class ClaudeCodeTools:
                 with open(path, 'r') as f:
                     content = f.read()
                 
-                if old_str not in content:
+                # Single scan: locate the match once and splice around it
+                idx = content.find(old_str)
+                if idx == -1:
                     return {
                         "type": "str_replace_editor",
                         "error": f"String not found: {old_str[:50]}..."
                     }
                 
-                new_content = content.replace(old_str, new_str, 1)
+                new_content = content[:idx] + new_str + content[idx + len(old_str):]
                 
                 with open(path, 'w') as f:
                     f.write(new_content)
@@ -174,39 +253,23 @@ class ClaudeCodeProxy(BaseHTTPRequestHandler):
         """Override to use structured logging"""
         logger.info(format, *args)
     
+    def send_json(self, body: bytes):
+        """Send a 200 response with an already-encoded JSON body"""
+        self.send_response(200)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
     def do_GET(self):
         """Handle GET requests"""
         if self.path == "/health":
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            
-            health_data = {
-                "status": "healthy",
-                "claude_code_proxy": "active",
-                "tools_enabled": True,
-                "timestamp": datetime.now().isoformat()
-            }
-            self.wfile.write(json.dumps(health_data).encode())
+            # Only the timestamp changes between polls
+            timestamp = datetime.now().isoformat().encode()
+            self.send_json(HEALTH_BODY_TEMPLATE % timestamp)
             
         elif self.path == "/v1/models":
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            
-            models_data = {
-                "object": "list",
-                "data": [
-                    {
-                        "id": "claude-3-5-sonnet-20241022",
-                        "object": "model", 
-                        "created": int(time.time()),
-                        "owned_by": "anthropic",
-                        "type": "text"
-                    }
-                ]
-            }
-            self.wfile.write(json.dumps(models_data).encode())
+            self.send_json(MODELS_BODY)
         else:
             self.send_error(404)
     
@@ -222,7 +285,7 @@ class ClaudeCodeProxy(BaseHTTPRequestHandler):
         try:
             content_length = int(self.headers['Content-Length'])
             post_data = self.rfile.read(content_length)
-            request_data = json.loads(post_data.decode())
+            request_data = json_loads(post_data)
             
             logger.info(f"📨 Claude Code request: {len(request_data.get('messages', []))} messages")
             
@@ -238,10 +301,7 @@ class ClaudeCodeProxy(BaseHTTPRequestHandler):
                 if self.should_use_tools(response):
                     response = self.enhance_with_tools(response)
             
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            self.wfile.write(json.dumps(response).encode())
+            self.send_json(json_bytes(response))
             
         except Exception as e:
             logger.error(f"❌ Error handling request: {e}")
@@ -252,7 +312,7 @@ class ClaudeCodeProxy(BaseHTTPRequestHandler):
         for msg in messages:
             content = msg.get('content', '')
             if isinstance(content, str):
-                if '<bash>' in content or '<str_replace_editor>' in content:
+                if TOOL_CALL_RE.search(content):
                     return True
         return False
     
@@ -260,43 +320,28 @@ class ClaudeCodeProxy(BaseHTTPRequestHandler):
         """Determine if response should trigger tool usage"""
         content = self.extract_text_content(response)
         
-        # Look for patterns that indicate tool usage
-        patterns = [
-            r'```bash\n(.*?)\n```',
-            r'I\'ll (run|execute|create|write|edit)',
-            r'Let me (run|execute|create|write|edit)',
-        ]
-        
-        for pattern in patterns:
-            if re.search(pattern, content, re.DOTALL | re.IGNORECASE):
-                return True
-        return False
+        return TOOL_TRIGGER_RE.search(content) is not None
     
     def enhance_with_tools(self, response: Dict) -> Dict:
         """Enhance response by executing tools mentioned in the text"""
         content = self.extract_text_content(response)
         
-        # Look for bash commands
-        bash_pattern = r'```bash\n(.*?)\n```'
-        matches = re.findall(bash_pattern, content, re.DOTALL)
+        matches = [m for m in BASH_BLOCK_RE.finditer(content) if m.group(1).strip()]
         
-        enhanced_content = content
-        for command in matches:
-            if command.strip():
-                result = self.tools.bash(command.strip())
-                
-                # Insert actual execution results
-                execution_block = f"\n\n**Execution Result:**\n```\nExit code: {result['exit_code']}\n"
-                if result['stdout']:
-                    execution_block += f"Output:\n{result['stdout']}\n"
-                if result['stderr']:
-                    execution_block += f"Error:\n{result['stderr']}\n"
-                execution_block += "```"
-                
-                enhanced_content = enhanced_content.replace(
-                    f"```bash\n{command}\n```",
-                    f"```bash\n{command}\n```{execution_block}"
-                )
+        # Identical commands are only executed once
+        commands = list(dict.fromkeys(m.group(1).strip() for m in matches))
+        results = self.run_bash_commands(commands)
+        
+        # Rebuild the content in a single pass, appending each bash block's
+        # execution result right after the block
+        parts = []
+        last = 0
+        for match in matches:
+            parts.append(content[last:match.end()])
+            parts.append(self.format_execution_result(results[match.group(1).strip()]))
+            last = match.end()
+        parts.append(content[last:])
+        enhanced_content = ''.join(parts)
         
         # Update response with enhanced content
         if "content" in response and isinstance(response["content"], list):
@@ -304,19 +349,35 @@ class ClaudeCodeProxy(BaseHTTPRequestHandler):
         
         return response
     
+    def run_bash_commands(self, commands: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Execute commands in order, concurrently only when all are read-only"""
+        if len(commands) < 2 or not all(map(is_read_only_command, commands)):
+            return {command: self.tools.bash(command) for command in commands}
+        
+        with ThreadPoolExecutor(max_workers=min(MAX_PARALLEL_COMMANDS, len(commands))) as executor:
+            return dict(zip(commands, executor.map(self.tools.bash, commands)))
+    
+    def format_execution_result(self, result: Dict[str, Any]) -> str:
+        """Format a bash result as a block inserted after its command"""
+        execution_block = f"\n\n**Execution Result:**\n```\nExit code: {result['exit_code']}\n"
+        if result['stdout']:
+            execution_block += f"Output:\n{result['stdout']}\n"
+        if result['stderr']:
+            execution_block += f"Error:\n{result['stderr']}\n"
+        execution_block += "```"
+        return execution_block
+    
     def forward_to_qwen(self, request_data: Dict) -> Dict:
         """Forward request to Qwen backend with function calling support"""
         try:
-            # Enhance messages with tool calling instructions
+            # Enhance messages with tool calling instructions. request_data is
+            # parsed fresh per request and not reused, so update it in place.
             messages = request_data.get('messages', [])
-            enhanced_messages = self.add_tool_instructions(messages)
-            
-            enhanced_request = request_data.copy()
-            enhanced_request['messages'] = enhanced_messages
-            enhanced_request['model'] = 'qwen3-coder'  # Use correct backend model
+            request_data['messages'] = self.add_tool_instructions(messages)
+            request_data['model'] = 'qwen3-coder'  # Use correct backend model
             
             # Prepare request
-            req_data = json.dumps(enhanced_request).encode()
+            req_data = json_bytes(request_data)
             req = urllib.request.Request(
                 f"{self.vast_api_url}/v1/messages",
                 data=req_data,
@@ -326,9 +387,9 @@ class ClaudeCodeProxy(BaseHTTPRequestHandler):
             # Send request  
             try:
                 with urllib.request.urlopen(req, timeout=60) as response:
-                    response_data = response.read().decode()
-                    logger.info(f"✅ Qwen response received ({len(response_data)} chars)")
-                    return json.loads(response_data)
+                    response_data = response.read()
+                    logger.info(f"✅ Qwen response received ({len(response_data)} bytes)")
+                    return json_loads(response_data)
             except urllib.error.HTTPError as e:
                 error_msg = e.read().decode() if hasattr(e, 'read') else str(e)
                 logger.error(f"❌ HTTP Error {e.code}: {error_msg}")
@@ -346,13 +407,14 @@ class ClaudeCodeProxy(BaseHTTPRequestHandler):
             }
     
     def add_tool_instructions(self, messages: List[Dict]) -> List[Dict]:
-        """Add tool calling instructions to messages for better Qwen integration"""
+        """Add tool calling instructions to messages for better Qwen integration
+        
+        The messages list is updated in place and returned.
+        """
         
         # Add system message with tool instructions if not present
         has_system = any(msg.get('role') == 'system' for msg in messages)
         
-        enhanced_messages = []
-        
         if not has_system:
             tool_system_msg = {
                 "role": "system",
@@ -366,10 +428,9 @@ When you need to execute commands or work with files, use these patterns:
 
 You can execute bash commands, create/edit files, and help with coding tasks."""
             }
-            enhanced_messages.append(tool_system_msg)
+            messages.insert(0, tool_system_msg)
         
-        enhanced_messages.extend(messages)
-        return enhanced_messages
+        return messages
     
     def extract_text_content(self, response: Dict) -> str:
         """Extract text content from Claude API response"""
@@ -393,7 +454,10 @@ def main():
     logger.info('claude "Write a Python script and run it"')
     logger.info("")
     
-    server = HTTPServer(('localhost', PORT), ClaudeCodeProxy)
+    # One thread per connection so a slow backend call or tool execution
+    # doesn't block other clients
+    server = ThreadingHTTPServer(('localhost', PORT), ClaudeCodeProxy)
+    server.daemon_threads = True
     
     try:
         server.serve_forever()
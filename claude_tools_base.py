@@ -5,47 +5,276 @@ Provides common tool implementations that all proxies can inherit from
 """
 
 import os
+import sys
 import json
+import asyncio
 import subprocess
+import itertools
+import shlex
+import signal
+import mmap
 import tempfile
-import uuid
+import secrets
 import re
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple, Union
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
+# Blocked bash command patterns, fused into a single regex at import
+DANGEROUS_PATTERNS = [
+    r'rm\s+-rf\s+/', r'rm\s+-rf\s+\*', r'\bformat\b', r'\bfdisk\b', r'\bmkfs\b',
+    r'dd\s+if=', r':\(\)\s*\{\s*:\|:&\s*\};:', r'chmod\s+-R\s+777\s+/',
+    r'chown\s+-R', r'\bpasswd\b', r'sudo\s+su', r'\bsu\s+-',
+    r'curl.*169\.254\.169\.254',  # Block metadata access
+    r'>\s*/dev/sd[a-z]',  # Block direct disk writes
+    r'mkfs\.',  # Block any mkfs variant
+]
+DANGEROUS_COMMAND_RE = re.compile("|".join(f"(?:{p})" for p in DANGEROUS_PATTERNS), re.IGNORECASE)
+
+# Commands containing any of these (or starting with a builtin/assignment)
+# still go through /bin/sh; everything else is exec'd directly
+SHELL_METACHARS = frozenset('|&;<>$`*?()[]{}~!#\n')
+SHELL_BUILTINS = frozenset({
+    'cd', 'export', 'source', '.', 'alias', 'unset', 'set', 'exit',
+    'eval', 'exec', 'ulimit', 'umask', 'shopt', 'pushd', 'popd', 'type'
+})
+
+
+def split_simple_command(command: str) -> Optional[List[str]]:
+    """Return argv for a command that needs no shell, or None"""
+    if any(ch in SHELL_METACHARS for ch in command):
+        return None
+    try:
+        argv = shlex.split(command)
+    except ValueError:
+        return None
+    if not argv or argv[0] in SHELL_BUILTINS or '=' in argv[0]:
+        return None
+    return argv
+
+
+# 1 MiB stdout/stderr pipes so chatty commands don't stall on the 64 KiB
+# default (pipesize needs 3.10+ and is ignored without F_SETPIPE_SZ)
+PIPE_KWARGS = {'pipesize': 1 << 20} if sys.version_info >= (3, 10) else {}
+
+
+def communicate_or_kill(process: subprocess.Popen, timeout: int) -> Tuple[int, str, str]:
+    """communicate() with a timeout that kills the child's whole process group"""
+    try:
+        stdout, stderr = process.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        # Kill the whole group so children of the command die too
+        os.killpg(process.pid, signal.SIGKILL)
+        process.communicate()
+        raise
+    return process.returncode, stdout, stderr
+
+
+def run_shell_command(command: str, timeout: int = 30, env: Optional[Dict[str, str]] = None) -> Tuple[int, str, str]:
+    """Run command through /bin/sh in its own session; raises TimeoutExpired"""
+    process = subprocess.Popen(
+        command,
+        shell=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        env=env,
+        start_new_session=True,
+        **PIPE_KWARGS
+    )
+    return communicate_or_kill(process, timeout)
+
+
+# Short ids: one random prefix per process plus a counter, instead of a
+# urandom read for every session/message
+_ID_PREFIX = secrets.token_hex(4)
+_id_counter = itertools.count(1)
+
+
+def next_id(prefix: str = "") -> str:
+    """Return a process-unique id such as 'msg_3fa9c2d1a'"""
+    return f"{prefix}{_ID_PREFIX}{next(_id_counter):x}"
+
+
+# Optional orjson for faster request/response (de)serialization
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+# Starlette comes with the FastAPI proxies; claude_code_tools_proxy runs on
+# the stdlib HTTP server and only uses the JSON helpers
+try:
+    from starlette.responses import JSONResponse
+    HAS_STARLETTE = True
+except ImportError:
+    HAS_STARLETTE = False
+
+
+def json_dumps(obj: Any) -> str:
+    if HAS_ORJSON:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj)
+
+
+def json_bytes(obj: Any) -> bytes:
+    if HAS_ORJSON:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode()
+
+
+def json_loads(data: Union[str, bytes]) -> Any:
+    if HAS_ORJSON:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+if HAS_STARLETTE:
+    class ORJSONResponse(JSONResponse):
+        """JSONResponse rendered with orjson when it is installed"""
+        def render(self, content: Any) -> bytes:
+            if HAS_ORJSON:
+                return orjson.dumps(content)
+            return super().render(content)
+
+
+def sse_event(event_type: str, data: Dict[str, Any]) -> str:
+    """Format an Anthropic-style server-sent event"""
+    return f"event: {event_type}\ndata: {json_dumps(data)}\n\n"
+
+
+def text_delta(text: str) -> str:
+    return sse_event("content_block_delta", {
+        "type": "content_block_delta",
+        "index": 0,
+        "delta": {"type": "text_delta", "text": text}
+    })
+
+
+class RequestCoalescer:
+    """Dispatch completion requests that arrive within a short window together
+    
+    Requests landing in the same window (up to max_batch) reach the backend
+    back to back over the shared client. Each caller still gets its own
+    response as soon as it is ready. Concurrent handlers already post
+    concurrently, so the window only adds latency unless a backend benefits
+    from grouped arrivals; a window of 0 (the proxies' default) posts
+    directly.
+    """
+    
+    def __init__(self, client: Any, window: float, max_batch: int):
+        self.client = client
+        self.window = window
+        self.max_batch = max_batch
+        self._queue = None
+        self._worker = None
+        self._inflight = set()
+    
+    async def post(self, url: str, **kwargs) -> Any:
+        if self.window <= 0:
+            return await self.client.post(url, **kwargs)
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((url, kwargs, future))
+        return await future
+    
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            # One task per request: nobody waits on the slowest in the batch,
+            # and the next window opens while this one generates
+            for url, kwargs, future in batch:
+                if future.cancelled():
+                    continue
+                task = asyncio.create_task(self._send(url, kwargs, future))
+                self._inflight.add(task)
+                task.add_done_callback(self._inflight.discard)
+                # A caller that disconnects cancels its future; stop the post too
+                future.add_done_callback(lambda f, task=task: f.cancelled() and task.cancel())
+    
+    async def _send(self, url: str, kwargs: Dict[str, Any], future: asyncio.Future):
+        try:
+            response = await self.client.post(url, **kwargs)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+        if not future.done():
+            future.set_result(response)
+    
+    async def aclose(self):
+        if self._worker is not None:
+            self._worker.cancel()
+
+
+# Per-session cache of file bytes for view/str_replace, keyed on path and
+# validated against (mtime_ns, size, inode) so outside edits are picked up
+FILE_CACHE_ENTRIES = int(os.getenv('TOOLS_FILE_CACHE_ENTRIES', 32))
+FILE_CACHE_MAX_BYTES = 1 << 20
+
+
+# Built once and shared by every request that lacks its own system prompt
+TOOL_SYSTEM_MESSAGE = {
+    "role": "system",
+    "content": """You are a helpful coding assistant with access to system tools.
+
+When you need to execute commands or work with files, be explicit about your actions:
+- For bash commands: Write ```bash\\ncommand\\n``` blocks
+- For file creation: Say "I'll create a file named 'filename'" and include the content
+- Always show the actual commands you want to execute in code blocks
+- Be specific about file paths and command syntax
+
+You have access to bash execution and file operations."""
+}
+
 
 class ClaudeCodeTools:
     """Base class implementing Claude Code's core tools"""
     
     def __init__(self):
         self.temp_files = {}
-        self.session_id = str(uuid.uuid4())
+        self.session_id = next_id("s")
+        self._file_cache = OrderedDict()
+        self._file_cache_lock = threading.Lock()
+        self.refresh_env()
+    
+    def refresh_env(self):
+        """Snapshot the environment passed to bash subprocesses"""
+        self._subproc_env = dict(os.environ, PATH=os.environ.get('PATH', ''))
         
     def bash(self, command: str) -> Dict[str, Any]:
         """Execute bash commands with security checks"""
         
         # Enhanced security checks with regex patterns
-        dangerous_patterns = [
-            r'rm\s+-rf\s+/', r'rm\s+-rf\s+\*', r'\bformat\b', r'\bfdisk\b', r'\bmkfs\b',
-            r'dd\s+if=', r':\(\)\s*\{\s*:\|:&\s*\};:', r'chmod\s+-R\s+777\s+/',
-            r'chown\s+-R', r'\bpasswd\b', r'sudo\s+su', r'\bsu\s+-',
-            r'curl.*169\.254\.169\.254',  # Block metadata access
-            r'>\s*/dev/sd[a-z]',  # Block direct disk writes
-            r'mkfs\.',  # Block any mkfs variant
-        ]
-        
-        for pattern in dangerous_patterns:
-            if re.search(pattern, command, re.IGNORECASE):
-                return {
-                    "type": "bash",
-                    "exit_code": 1,
-                    "stdout": "",
-                    "stderr": f"Security: Command blocked by security policy"
-                }
+        if DANGEROUS_COMMAND_RE.search(command):
+            return {
+                "type": "bash",
+                "exit_code": 1,
+                "stdout": "",
+                "stderr": f"Security: Command blocked by security policy"
+            }
         
         try:
-            print(f"🔧 Executing bash: {command}")
+            logger.debug("🔧 Executing bash: %s", command)
             
             # Limit command length
             if len(command) > 1000:
@@ -56,21 +285,13 @@ class ClaudeCodeTools:
                     "stderr": "Command too long (max 1000 characters)"
                 }
             
-            result = subprocess.run(
-                command,
-                shell=True,
-                capture_output=True,
-                text=True,
-                timeout=30,
-                cwd=os.getcwd(),
-                env=dict(os.environ, PATH=os.environ.get('PATH', ''))
-            )
+            exit_code, stdout, stderr = self._run_command(command)
             
             return {
                 "type": "bash",
-                "exit_code": result.returncode,
-                "stdout": result.stdout,
-                "stderr": result.stderr
+                "exit_code": exit_code,
+                "stdout": stdout,
+                "stderr": stderr
             }
         except subprocess.TimeoutExpired:
             return {
@@ -87,6 +308,117 @@ class ClaudeCodeTools:
                 "stderr": str(e)
             }
     
+    def _run_command(self, command: str, timeout: int = 30):
+        """Run command in its own process group, skipping /bin/sh when possible"""
+        argv = split_simple_command(command)
+        try:
+            process = subprocess.Popen(
+                argv if argv else command,
+                shell=argv is None,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                env=self._subproc_env,
+                start_new_session=True,
+                **PIPE_KWARGS
+            )
+        except FileNotFoundError:
+            # Let the shell produce its usual "command not found" result
+            if argv is None:
+                raise
+            return run_shell_command(command, timeout, self._subproc_env)
+        return communicate_or_kill(process, timeout)
+    
+    def _write_bytes(self, path: str, data: bytes):
+        """Write data with raw os.write calls, bypassing Python's buffered writer"""
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+        finally:
+            os.close(fd)
+    
+    def _atomic_write(self, path: str, data: bytes):
+        """Replace path via a temp file + rename so readers never see a torn write
+        
+        Symlinks are resolved so the link survives and its target is
+        replaced, and the temp file takes the original's mode and owner.
+        """
+        path = os.path.realpath(path)
+        st = os.stat(path)
+        tmp_path = f"{path}.{next_id()}.tmp"
+        self._write_bytes(tmp_path, data)
+        try:
+            os.chmod(tmp_path, st.st_mode & 0o7777)
+            tmp_st = os.stat(tmp_path)
+            if (tmp_st.st_uid, tmp_st.st_gid) != (st.st_uid, st.st_gid):
+                try:
+                    os.chown(tmp_path, st.st_uid, st.st_gid)
+                except PermissionError:
+                    # Can't hand the file to its owner; write in place instead
+                    os.unlink(tmp_path)
+                    self._write_bytes(path, data)
+                    return
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+    
+    def _cache_lookup(self, path: str) -> Optional[bytes]:
+        """Cached bytes of path if the file is unchanged since they were stored"""
+        key = os.path.abspath(path)
+        st = os.stat(key)
+        stamp = (st.st_mtime_ns, st.st_size, st.st_ino)
+        with self._file_cache_lock:
+            entry = self._file_cache.get(key)
+            if entry and entry[0] == stamp:
+                self._file_cache.move_to_end(key)
+                return entry[1]
+        return None
+    
+    def _read_cached(self, path: str) -> bytes:
+        """Read path, serving unchanged files from the session file cache"""
+        data = self._cache_lookup(path)
+        if data is not None:
+            return data
+        
+        key = os.path.abspath(path)
+        with open(key, 'rb') as f:
+            data = f.read()
+        self._cache_file(key, data)
+        return data
+    
+    def _cache_file(self, path: str, data: Optional[bytes]):
+        """Remember data as the current contents of path (None just evicts)"""
+        key = os.path.abspath(path)
+        with self._file_cache_lock:
+            self._file_cache.pop(key, None)
+            if data is None or len(data) > FILE_CACHE_MAX_BYTES or FILE_CACHE_ENTRIES <= 0:
+                return
+            try:
+                st = os.stat(key)
+            except OSError:
+                return
+            if st.st_size != len(data):
+                return
+            self._file_cache[key] = ((st.st_mtime_ns, st.st_size, st.st_ino), data)
+            if len(self._file_cache) > FILE_CACHE_ENTRIES:
+                self._file_cache.popitem(last=False)
+    
+    def _replace_in_place(self, path: str, old: bytes, new: bytes) -> bool:
+        """Overwrite a same-length match through mmap; False if not found"""
+        with open(path, 'r+b') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return False
+            with mmap.mmap(f.fileno(), 0) as mm:
+                idx = mm.find(old)
+                if idx == -1:
+                    return False
+                mm[idx:idx + len(old)] = new
+        return True
+    
     def _validate_file_path(self, path: str) -> bool:
         """Validate file path to prevent directory traversal"""
         if not path:
@@ -123,8 +455,9 @@ class ClaudeCodeTools:
 
         if command == "create":
             try:
-                with open(path, 'w') as f:
-                    f.write(file_text or "")
+                data = (file_text or "").encode()
+                self._write_bytes(path, data)
+                self._cache_file(path, data)
                 return {
                     "type": "str_replace_editor",
                     "result": f"File created successfully at: {path}"
@@ -137,13 +470,25 @@ class ClaudeCodeTools:
                 
         elif command == "view":
             try:
-                with open(path, 'r') as f:
-                    content = f.read()
-                
-                if view_range:
-                    lines = content.split('\n')
+                data = self._cache_lookup(path)
+                if data is None and view_range:
+                    # Not cached (large files never are): only materialize
+                    # the requested window of lines
                     start, end = view_range
-                    content = '\n'.join(lines[start-1:end])
+                    with open(path, 'r') as f:
+                        content = ''.join(itertools.islice(f, start-1, end))
+                    if content.endswith('\n'):
+                        content = content[:-1]
+                else:
+                    if data is None:
+                        data = self._read_cached(path)
+                    content = data.decode()
+                    if '\r' in content:
+                        # Same newline translation as a text-mode read
+                        content = content.replace('\r\n', '\n').replace('\r', '\n')
+                    if view_range:
+                        start, end = view_range
+                        content = '\n'.join(content.split('\n')[start-1:end])
                 
                 return {
                     "type": "str_replace_editor",
@@ -157,19 +502,30 @@ class ClaudeCodeTools:
                 
         elif command == "str_replace":
             try:
-                with open(path, 'r') as f:
-                    content = f.read()
-                
-                if old_str not in content:
-                    return {
-                        "type": "str_replace_editor",
-                        "error": f"String not found: {old_str[:50]}..."
-                    }
-                
-                new_content = content.replace(old_str, new_str, 1)
+                not_found = {
+                    "type": "str_replace_editor",
+                    "error": f"String not found: {old_str[:50]}..."
+                }
+                old_bytes = old_str.encode()
+                new_bytes = new_str.encode()
                 
-                with open(path, 'w') as f:
-                    f.write(new_content)
+                if old_bytes and len(old_bytes) == len(new_bytes):
+                    # Same-size edit: patch the mapped file, no rewrite needed
+                    replaced = self._replace_in_place(path, old_bytes, new_bytes)
+                    self._cache_file(path, None)
+                    if not replaced:
+                        return not_found
+                else:
+                    content = self._read_cached(path)
+                    
+                    # Single scan: locate the match once and splice around it
+                    idx = content.find(old_bytes)
+                    if idx == -1:
+                        return not_found
+                    
+                    new_content = content[:idx] + new_bytes + content[idx + len(old_bytes):]
+                    self._atomic_write(path, new_content)
+                    self._cache_file(path, new_content)
                 
                 return {
                     "type": "str_replace_editor",
@@ -191,8 +547,9 @@ class ClaudeCodeTools:
                 "error": "Invalid file path: access denied"
             }
         try:
-            with open(path, 'w') as f:
-                f.write(content)
+            data = content.encode()
+            self._write_bytes(path, data)
+            self._cache_file(path, data)
             return {
                 "type": "write_file",
                 "result": f"File written successfully at: {path}"
@@ -204,6 +561,67 @@ class ClaudeCodeTools:
             }
 
 
+# Tool trigger phrases, fused into one alternation so should_use_tools
+# decides with a single scan
+TOOL_TRIGGER_PATTERNS = [
+    r'```bash\n(.*?)\n```',
+    r'I\'ll (run|execute|create|write|edit)',
+    r'Let me (run|execute|create|write|edit)',
+    r'I need to (run|execute|create|write|edit)',
+    r'I\'m going to (run|execute|create|write|edit)',
+    r'Creating? (a )?file',
+    r'Writing (a )?file',
+    r'Running (the )?command',
+]
+TOOL_TRIGGER_RE = re.compile(
+    "|".join(f"(?:{pattern})" for pattern in TOOL_TRIGGER_PATTERNS),
+    re.DOTALL | re.IGNORECASE
+)
+BASH_BLOCK_RE = re.compile(r'```bash\n(.*?)\n```', re.DOTALL)
+FILE_CREATE_RE = re.compile(r'creat[ei]ng?\s+.*file.*named?\s+"([^"]+)"', re.IGNORECASE)
+FILE_CONTENT_RE = re.compile(r'with.*content\s+"([^"]+)"', re.IGNORECASE)
+
+
+def find_file_create(content: str) -> Optional[re.Match]:
+    """FILE_CREATE_RE.search, skipped outright when there is no quoted name to capture"""
+    if '"' not in content:
+        return None
+    return FILE_CREATE_RE.search(content)
+
+# One pass over a completion: fenced bash blocks (captured, case-sensitive
+# like extract_tool_requests) or any of the should_use_tools trigger phrases
+TOOL_SCAN_RE = re.compile(
+    r'```bash\n(?P<bash>.*?)\n```'
+    r'|(?i:' + "|".join(f"(?:{pattern})" for pattern in TOOL_TRIGGER_PATTERNS) + ')',
+    re.DOTALL
+)
+
+# Bash requests run sequentially unless every one is a single read-only
+# command: anything that writes (mkdir then touch, git add then commit, mv,
+# cp, rm) or chains, pipes, redirects or substitutes may depend on an
+# earlier step
+MAX_PARALLEL_TOOLS = 8
+READ_ONLY_COMMANDS = frozenset({
+    'ls', 'cat', 'head', 'tail', 'grep', 'egrep', 'fgrep', 'rg', 'find', 'wc',
+    'pwd', 'echo', 'stat', 'file', 'du', 'df', 'which', 'tree', 'diff',
+    'date', 'whoami', 'uname', 'printenv',
+})
+SHELL_CONTROL_RE = re.compile(r'[;&|<>`\n]|\$\(')
+# find actions that run commands or touch files
+FIND_WRITE_ACTIONS = frozenset({'-exec', '-execdir', '-ok', '-okdir', '-delete', '-fprint', '-fprint0', '-fprintf', '-fls'})
+
+
+def is_read_only_command(command: str) -> bool:
+    """True for a single allowlisted command with no chaining, pipes,
+    redirection or substitution, safe to run alongside others"""
+    if SHELL_CONTROL_RE.search(command):
+        return False
+    words = command.split()
+    if not words or words[0] not in READ_ONLY_COMMANDS:
+        return False
+    return words[0] != 'find' or FIND_WRITE_ACTIONS.isdisjoint(words)
+
+
 class ToolExecutionMixin:
     """Mixin class providing tool execution logic for proxies"""
     
@@ -212,31 +630,17 @@ class ToolExecutionMixin:
     
     def should_use_tools(self, content: str) -> bool:
         """Determine if response should trigger tool usage"""
-        patterns = [
-            r'```bash\n(.*?)\n```',
-            r'I\'ll (run|execute|create|write|edit)',
-            r'Let me (run|execute|create|write|edit)',
-            r'I need to (run|execute|create|write|edit)',
-            r'I\'m going to (run|execute|create|write|edit)',
-            r'Creating? (a )?file',
-            r'Writing (a )?file',
-            r'Running (the )?command',
-        ]
-        
-        for pattern in patterns:
-            if re.search(pattern, content, re.DOTALL | re.IGNORECASE):
-                return True
-        return False
+        # Fenced bash is the common positive; a substring test beats the regex
+        if "```bash" in content:
+            return True
+        return TOOL_TRIGGER_RE.search(content) is not None
 
     def extract_tool_requests(self, content: str) -> List[Dict]:
         """Extract tool requests from Claude's response"""
         tool_requests = []
         
         # Extract bash commands
-        bash_pattern = r'```bash\n(.*?)\n```'
-        bash_matches = re.findall(bash_pattern, content, re.DOTALL)
-        
-        for command in bash_matches:
+        for command in BASH_BLOCK_RE.findall(content):
             if command.strip():
                 tool_requests.append({
                     "type": "bash",
@@ -244,73 +648,122 @@ class ToolExecutionMixin:
                 })
         
         # Extract file creation requests (simple pattern matching)
-        if re.search(r'creat[ei]ng?\s+.*file.*named?\s+"([^"]+)"', content, re.IGNORECASE):
-            file_match = re.search(r'creat[ei]ng?\s+.*file.*named?\s+"([^"]+)"', content, re.IGNORECASE)
-            if file_match:
-                filename = file_match.group(1)
-                # Look for content in the same response
-                content_match = re.search(r'with.*content\s+"([^"]+)"', content, re.IGNORECASE)
-                file_content = content_match.group(1) if content_match else ""
-                
+        file_match = find_file_create(content)
+        if file_match:
+            filename = file_match.group(1)
+            # Look for content in the same response
+            content_match = FILE_CONTENT_RE.search(content)
+            file_content = content_match.group(1) if content_match else ""
+            
+            tool_requests.append({
+                "type": "str_replace_editor",
+                "command": "create",
+                "path": filename,
+                "file_text": file_content
+            })
+        
+        return tool_requests
+
+    def detect_and_extract_tools(self, content: str) -> Optional[List[Dict]]:
+        """should_use_tools + extract_tool_requests in a single scan
+        
+        Returns None when no trigger is present, otherwise the tool requests
+        (possibly empty).
+        """
+        triggered = False
+        tool_requests = []
+        
+        for match in TOOL_SCAN_RE.finditer(content):
+            triggered = True
+            command = match.group('bash')
+            if command and command.strip():
                 tool_requests.append({
-                    "type": "str_replace_editor",
-                    "command": "create",
-                    "path": filename,
-                    "file_text": file_content
+                    "type": "bash",
+                    "command": command.strip()
                 })
         
+        if not triggered:
+            return None
+        
+        file_match = find_file_create(content)
+        if file_match:
+            content_match = FILE_CONTENT_RE.search(content)
+            tool_requests.append({
+                "type": "str_replace_editor",
+                "command": "create",
+                "path": file_match.group(1),
+                "file_text": content_match.group(1) if content_match else ""
+            })
+        
         return tool_requests
 
+    def _execute_one(self, index: int, total: int, request: Dict, timestamp: str) -> Optional[str]:
+        """Run a single tool request and format its result"""
+        try:
+            tool_type = request["type"]
+            logger.debug("🛠️  [%s] Tool %d/%d: %s", timestamp, index + 1, total, tool_type)
+            
+            if request["type"] == "bash":
+                command = request["command"]
+                result = self.tools.bash(command)
+                return f"\n**Bash Execution:**\n```\nCommand: {command}\nExit code: {result['exit_code']}\nOutput: {result['stdout']}\nError: {result['stderr']}\n```"
+            
+            elif request["type"] == "str_replace_editor":
+                result = self.tools.str_replace_editor(**{k: v for k, v in request.items() if k != "type"})
+                if "error" in result:
+                    return f"\n**File Operation Error:** {result['error']}"
+                return f"\n**File Operation:** {result['result']}"
+            
+        except Exception as e:
+            logger.warning("❌ [%s] Tool execution error: %s", timestamp, e)
+            return f"\n**Tool Error:** {str(e)}"
+        return None
+
+    def _can_run_parallel(self, tool_requests: List[Dict]) -> bool:
+        """True when every request is a read-only bash command"""
+        return len(tool_requests) > 1 and all(
+            request.get("type") == "bash" and is_read_only_command(request.get("command", ""))
+            for request in tool_requests
+        )
+
     def execute_tools(self, tool_requests: List[Dict]) -> str:
         """Execute tool requests and return results"""
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        print(f"🔧 [{timestamp}] TOOL EXECUTION STARTED - {len(tool_requests)} tools requested")
+        total = len(tool_requests)
+        logger.debug("🔧 [%s] TOOL EXECUTION STARTED - %d tools requested", timestamp, total)
         
-        results = []
+        if self._can_run_parallel(tool_requests):
+            # Results come back in request order, so output stays deterministic
+            with ThreadPoolExecutor(max_workers=min(MAX_PARALLEL_TOOLS, total)) as executor:
+                results = list(executor.map(
+                    lambda item: self._execute_one(item[0], total, item[1], timestamp),
+                    enumerate(tool_requests)
+                ))
+        else:
+            results = [self._execute_one(i, total, request, timestamp) for i, request in enumerate(tool_requests)]
         
-        for i, request in enumerate(tool_requests):
-            try:
-                tool_type = request["type"]
-                print(f"🛠️  [{timestamp}] Tool {i+1}/{len(tool_requests)}: {tool_type}")
-                
-                if request["type"] == "bash":
-                    command = request["command"]
-                    result = self.tools.bash(command)
-                    results.append(f"\n**Bash Execution:**\n```\nCommand: {command}\nExit code: {result['exit_code']}\nOutput: {result['stdout']}\nError: {result['stderr']}\n```")
-                
-                elif request["type"] == "str_replace_editor":
-                    result = self.tools.str_replace_editor(**{k: v for k, v in request.items() if k != "type"})
-                    if "error" in result:
-                        results.append(f"\n**File Operation Error:** {result['error']}")
-                    else:
-                        results.append(f"\n**File Operation:** {result['result']}")
-                
-            except Exception as e:
-                print(f"❌ [{timestamp}] Tool execution error: {str(e)}")
-                results.append(f"\n**Tool Error:** {str(e)}")
+        logger.debug("🏁 [%s] TOOL EXECUTION COMPLETED - %d tools processed", timestamp, total)
+        return "\n".join(result for result in results if result is not None)
+
+    async def aexecute_tools(self, tool_requests: List[Dict]) -> str:
+        """Async execute_tools: independent tools run concurrently via asyncio.gather"""
+        if not self._can_run_parallel(tool_requests):
+            return await asyncio.to_thread(self.execute_tools, tool_requests)
         
-        print(f"🏁 [{timestamp}] TOOL EXECUTION COMPLETED - {len(tool_requests)} tools processed")
-        return "\n".join(results)
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        total = len(tool_requests)
+        logger.debug("🔧 [%s] TOOL EXECUTION STARTED - %d tools requested", timestamp, total)
+        
+        results = await asyncio.gather(*(
+            asyncio.to_thread(self._execute_one, i, total, request, timestamp)
+            for i, request in enumerate(tool_requests)
+        ))
+        
+        logger.debug("🏁 [%s] TOOL EXECUTION COMPLETED - %d tools processed", timestamp, total)
+        return "\n".join(result for result in results if result is not None)
 
     def add_tool_instructions_to_messages(self, messages: List[Dict]) -> List[Dict]:
         """Add tool calling instructions to messages"""
-        enhanced_messages = []
-        has_system = any(msg.get('role') == 'system' for msg in messages)
-        
-        if not has_system:
-            tool_system_msg = {
-                "role": "system",
-                "content": """You are a helpful coding assistant with access to system tools.
-
-When you need to execute commands or work with files, be explicit about your actions:
-- For bash commands: Write ```bash\\ncommand\\n``` blocks
-- For file creation: Say "I'll create a file named 'filename'" and include the content
-- Always show the actual commands you want to execute in code blocks
-- Be specific about file paths and command syntax
-
-You have access to bash execution and file operations."""
-            }
-            enhanced_messages.append(tool_system_msg)
-        
-        enhanced_messages.extend(messages)
-        return enhanced_messages
\ No newline at end of file
+        if any(msg.get('role') == 'system' for msg in messages):
+            return list(messages)
+        return [TOOL_SYSTEM_MESSAGE, *messages]
\ No newline at end of file
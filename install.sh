@@ -193,7 +193,8 @@ install_python_deps() {
     else
         echo -e "${BLUE}📦 Installing core dependencies...${NC}"
         python3 -m pip install \
-            fastapi==0.104.1 \
+            fastapi==0.115.12 \
+            starlette==0.46.2 \
             uvicorn[standard]==0.24.0 \
             redis==5.0.1 \
             requests==2.31.0 \
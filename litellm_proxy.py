@@ -5,18 +5,52 @@ Proper API translation between Anthropic and Ollama formats
 """
 
 import os
-from litellm import completion
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-from typing import List, Dict, Any, Optional, Union
+import time
+from contextlib import asynccontextmanager
+import httpx
+from litellm import acompletion
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
+from typing import List, Dict, Any, Optional, Union, AsyncIterator
 import uvicorn
 from datetime import datetime
 
-app = FastAPI(title="LiteLLM Proxy for Vast.ai")
+from claude_tools_base import ORJSONResponse, next_id, sse_event
 
 # Configuration - Point to vast.ai through SSH tunnel
 OLLAMA_HOST = "localhost:11434"  # This will be your vast.ai Ollama via SSH tunnel
 OLLAMA_BASE_URL = f"http://{OLLAMA_HOST}"
+HEALTH_CACHE_TTL = float(os.getenv('HEALTH_CACHE_TTL', 3))
+WEB_WORKERS = int(os.getenv('WEB_WORKERS', 4))
+
+# Shared client for cheap Ollama probes
+http_client = httpx.AsyncClient(timeout=5)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await http_client.aclose()
+
+app = FastAPI(
+    title="LiteLLM Proxy for Vast.ai",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
+)
+
+# Last Ollama probe result, reused for HEALTH_CACHE_TTL seconds
+_health_cache = {"ts": 0.0, "healthy": False}
+
+# Health/status timestamps only need second resolution, so format once per second
+_iso_cache = (0, "")
+
+def iso_timestamp() -> str:
+    """Current local time in ISO format, cached for the current second"""
+    global _iso_cache
+    second = int(time.time())
+    if _iso_cache[0] != second:
+        _iso_cache = (second, datetime.fromtimestamp(second).isoformat())
+    return _iso_cache[1]
 
 class Message(BaseModel):
     role: str
@@ -27,50 +61,91 @@ class ChatRequest(BaseModel):
     max_tokens: Optional[int] = 1000
     temperature: Optional[float] = 0.7
     model: Optional[str] = "qwen2.5-coder:7b"
+    stream: Optional[bool] = False
 
 def extract_text_content(content: Union[str, List[Dict[str, Any]]]) -> str:
     """Extract plain text from Claude CLI's complex content format"""
-    if isinstance(content, str):
+    # Exact type checks: plain strings are the common case
+    if type(content) is str:
         return content
     
-    if isinstance(content, list):
-        text_parts = []
-        for item in content:
-            if isinstance(item, dict):
-                if item.get("type") == "text":
-                    text_parts.append(item.get("text", ""))
-                elif "text" in item:
-                    text_parts.append(item["text"])
-        return "\n".join(text_parts)
+    if type(content) is list:
+        return "\n".join(
+            item["text"] for item in content
+            if type(item) is dict and "text" in item
+        )
     
     return str(content)
 
+async def stream_anthropic_events(response, model: str, message_id: str) -> AsyncIterator[str]:
+    """Convert a LiteLLM streaming completion into Anthropic stream events"""
+    yield sse_event("message_start", {
+        "type": "message_start",
+        "message": {
+            "id": message_id,
+            "type": "message",
+            "role": "assistant",
+            "content": [],
+            "model": model,
+            "stop_reason": None,
+            "stop_sequence": None,
+            "usage": {"input_tokens": 0, "output_tokens": 0}
+        }
+    })
+    yield sse_event("content_block_start", {
+        "type": "content_block_start",
+        "index": 0,
+        "content_block": {"type": "text", "text": ""}
+    })
+    
+    try:
+        async for chunk in response:
+            text = chunk.choices[0].delta.content if chunk.choices else None
+            if text:
+                yield sse_event("content_block_delta", {
+                    "type": "content_block_delta",
+                    "index": 0,
+                    "delta": {"type": "text_delta", "text": text}
+                })
+    except Exception as e:
+        yield sse_event("error", {
+            "type": "error",
+            "error": {"type": "api_error", "message": f"LiteLLM generation failed: {str(e)}"}
+        })
+        return
+    
+    yield sse_event("content_block_stop", {"type": "content_block_stop", "index": 0})
+    yield sse_event("message_delta", {
+        "type": "message_delta",
+        "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+        "usage": {"output_tokens": 0}
+    })
+    yield sse_event("message_stop", {"type": "message_stop"})
+
 @app.get("/")
 async def root():
     return {
         "service": "LiteLLM Proxy for Vast.ai",
         "status": "running",
         "ollama_host": OLLAMA_HOST,
-        "timestamp": datetime.now().isoformat()
+        "timestamp": iso_timestamp()
     }
 
 @app.get("/health")
 async def health():
-    try:
-        # Test Ollama connection via LiteLLM
-        response = completion(
-            model=f"ollama/qwen2.5-coder:7b",
-            messages=[{"role": "user", "content": "hi"}],
-            api_base=OLLAMA_BASE_URL,
-            max_tokens=1
-        )
-        ollama_healthy = bool(response)
-    except Exception as e:
-        ollama_healthy = False
+    if time.monotonic() - _health_cache["ts"] >= HEALTH_CACHE_TTL:
+        try:
+            # Listing models is enough to prove Ollama is up; no inference needed
+            response = await http_client.get(f"{OLLAMA_BASE_URL}/api/tags")
+            _health_cache["healthy"] = response.status_code == 200
+        except httpx.HTTPError:
+            _health_cache["healthy"] = False
+        _health_cache["ts"] = time.monotonic()
+    ollama_healthy = _health_cache["healthy"]
     
     return {
         "status": "healthy" if ollama_healthy else "degraded",
-        "timestamp": datetime.now().isoformat(),
+        "timestamp": iso_timestamp(),
         "components": {
             "ollama": "healthy" if ollama_healthy else "unhealthy",
             "litellm": "enabled"
@@ -85,39 +160,54 @@ async def list_models():
             {
                 "id": "qwen2.5-coder:7b",
                 "object": "model",
-                "created": int(datetime.now().timestamp()),
+                "created": int(time.time()),
                 "owned_by": "ollama"
             }
         ]
     }
 
 @app.post("/v1/messages")
-async def create_message(request: ChatRequest):
+async def create_message(raw_request: Request):
+    try:
+        # Parsed and validated in one pass by pydantic-core instead of
+        # json.loads followed by FastAPI's body validation
+        request = ChatRequest.model_validate_json(await raw_request.body())
+    except ValidationError as e:
+        # 400 like the other proxies (Anthropic's invalid_request_error)
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    message_id = next_id("msg_")
+    
     try:
         # Convert messages to LiteLLM format
-        litellm_messages = []
-        for msg in request.messages:
-            content = extract_text_content(msg.content)
-            litellm_messages.append({
-                "role": msg.role,
-                "content": content
-            })
+        litellm_messages = [
+            {"role": msg.role, "content": extract_text_content(msg.content)}
+            for msg in request.messages
+        ]
         
         # Map Claude models to available Ollama model
         ollama_model = "qwen2.5-coder:7b"  # Force use of available model
         
-        # Call LiteLLM with Ollama
-        response = completion(
+        # Call LiteLLM with Ollama without blocking the event loop
+        response = await acompletion(
             model=f"ollama/{ollama_model}",
             messages=litellm_messages,
             api_base=OLLAMA_BASE_URL,
             max_tokens=request.max_tokens,
-            temperature=request.temperature
+            temperature=request.temperature,
+            stream=bool(request.stream)
         )
         
+        if request.stream:
+            return StreamingResponse(
+                stream_anthropic_events(response, request.model, message_id),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+            )
+        
         # Convert to Anthropic format
         anthropic_response = {
-            "id": f"msg_{datetime.now().strftime('%Y%m%d%H%M%S')}",
+            "id": message_id,
             "type": "message", 
             "role": "assistant",
             "content": [
@@ -144,4 +234,12 @@ async def create_message(request: ChatRequest):
         )
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # Import string so uvicorn can spawn workers; uvicorn[standard] supplies
+    # uvloop + httptools, which the default "auto" loop/http settings pick up
+    uvicorn.run(
+        "litellm_proxy:app",
+        host="0.0.0.0",
+        port=8000,
+        workers=WEB_WORKERS,
+        backlog=2048
+    )
\ No newline at end of file
@@ -5,38 +5,239 @@ Fast, cost-effective LLM inference with Redis Cloud Enterprise caching
 """
 
 import os
-import os
+import time
+import hashlib
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
+import redis
 from modelcache import cache
 from modelcache.manager import CacheBase
-from modelcache.embedding import SentenceTransformer
+from sentence_transformers import SentenceTransformer
+
+# Optional xxhash for cheaper exact-match cache keys
+try:
+    import xxhash
+    HAS_XXHASH = True
+except ImportError:
+    HAS_XXHASH = False
+
+# Semantic cache hit threshold; 0.8 produced false-positive hits with
+# MiniLM embeddings (re-tune with scripts/sweep_similarity_threshold.py)
+SIMILARITY_THRESHOLD = float(os.getenv('CACHE_SIM_THRESHOLD', '0.87'))
+
+# Pooled HTTP session so repeated Ollama calls reuse keep-alive connections
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(
+    pool_connections=32,
+    pool_maxsize=64,
+    max_retries=Retry(total=2, backoff_factor=0.2)
+))
+
+# In-process exact-match tier in front of the semantic cache
+EXACT_CACHE_SIZE = int(os.getenv('EXACT_CACHE_SIZE', 10_000))
+_exact = OrderedDict()
+_exact_lock = threading.Lock()
+
+# Similarity scores seen during the current thread's semantic lookup
+_lookup = threading.local()
+
+
+class BatchedEmbedder:
+    """Embedding function that micro-batches concurrent lookups
+    
+    Callers block on a future while a background thread collects requests
+    for a short window (or until max_batch is reached) and embeds them with
+    a single encode() call.
+    """
+    
+    def __init__(self, model_name='all-MiniLM-L6-v2', max_batch=32, window=0.005,
+                 device=None, onnx_file=None, onnx_threads=None):
+        if not device:
+            # torch is only needed to probe for a GPU
+            try:
+                import torch
+                device = 'cuda' if torch.cuda.is_available() else 'cpu'
+            except ImportError:
+                device = 'cpu'
+        if onnx_file and device == 'cpu':
+            # Quantized ONNX export (e.g. onnx/model_qint8_avx512_vnni.onnx);
+            # needs sentence-transformers[onnx]
+            import onnxruntime
+            session_options = onnxruntime.SessionOptions()
+            # Leave half the cores for uvicorn/Redis I/O instead of ORT's all-core default
+            session_options.intra_op_num_threads = onnx_threads or max(1, (os.cpu_count() or 2) // 2)
+            self.model = SentenceTransformer(
+                model_name, device=device, backend='onnx',
+                model_kwargs={'file_name': onnx_file, 'session_options': session_options}
+            )
+            print(f"🧠 Embedding model {model_name} on cpu ({onnx_file}, "
+                  f"{session_options.intra_op_num_threads} threads)")
+        else:
+            self.model = SentenceTransformer(model_name, device=device)
+            if device.startswith('cuda'):
+                self.model.half()
+            print(f"🧠 Embedding model {model_name} on {device}")
+        self.dimension = self.model.get_sentence_embedding_dimension()
+        self.max_batch = max_batch
+        self.window = window
+        self._queue = queue.Queue()
+        threading.Thread(target=self._worker, daemon=True).start()
+    
+    def to_embeddings(self, data, **kwargs):
+        """Embed a single text, batched with any concurrent callers"""
+        future = Future()
+        self._queue.put((data, future))
+        return future.result()
+    
+    __call__ = to_embeddings
+    
+    def _worker(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            
+            texts = [text for text, _ in batch]
+            try:
+                vectors = self.model.encode(
+                    texts,
+                    batch_size=len(texts),
+                    convert_to_numpy=True,
+                    normalize_embeddings=True
+                )
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            
+            for (_, future), vector in zip(batch, vectors):
+                future.set_result(vector)
+
+
+class ScoreRecordingEvaluation:
+    """Wraps the cache's similarity evaluation to record every candidate
+    score, so each lookup can log its best match against the threshold"""
+    
+    def __init__(self, evaluation):
+        self.inner = evaluation
+    
+    def evaluation(self, *args, **kwargs):
+        score = self.inner.evaluation(*args, **kwargs)
+        scores = getattr(_lookup, 'scores', None)
+        if scores is not None:
+            scores.append(score)
+        return score
+    
+    def __getattr__(self, name):
+        return getattr(self.inner, name)
+
+
+def warm_redis_pool(pool, count):
+    """Open and PING `count` pooled connections so first requests skip the TLS handshake"""
+    count = max(0, min(count, pool.max_connections))
+    connections = []
+    try:
+        for _ in range(count):
+            connection = pool.get_connection('PING')
+            connections.append(connection)
+            connection.send_command('PING')
+            connection.read_response()
+        print(f"🔥 Warmed {len(connections)} Redis connections")
+    except redis.RedisError as e:
+        print(f"⚠️ Redis warmup failed: {e}")
+    finally:
+        for connection in connections:
+            pool.release(connection)
 
 
 def initialize_cache():
     """Initialize ModelCache with Redis Cloud Enterprise"""
-    redis_config = {
-        'host': os.getenv('REDIS_HOST'),
-        'port': int(os.getenv('REDIS_PORT', 14339)),
-        'password': os.getenv('REDIS_PASSWORD'),
-        'ssl': True
-    }
+    # Shared TLS pool so lookups reuse connections instead of re-handshaking
+    pool = redis.ConnectionPool(
+        host=os.getenv('REDIS_HOST'),
+        port=int(os.getenv('REDIS_PORT', 14339)),
+        password=os.getenv('REDIS_PASSWORD'),
+        connection_class=redis.SSLConnection,
+        max_connections=int(os.getenv('REDIS_POOL_SIZE', 64))
+    )
+    warm_redis_pool(pool, int(os.getenv('REDIS_POOL_WARMUP', 4)))
+    redis_config = {'connection_pool': pool}
     
     cache.init(
-        embedding_func=SentenceTransformer('all-MiniLM-L6-v2'),
+        embedding_func=BatchedEmbedder(
+            'all-MiniLM-L6-v2',
+            max_batch=int(os.getenv('EMBED_MAX_BATCH', 32)),
+            window=float(os.getenv('EMBED_BATCH_WINDOW_MS', 5)) / 1000,
+            device=os.getenv('EMBED_DEVICE'),
+            onnx_file=os.getenv('EMBED_ONNX_FILE'),
+            onnx_threads=int(os.getenv('EMBED_ONNX_THREADS', 0))
+        ),
         data_manager=CacheBase(name='redis', config=redis_config),
-        similarity_threshold=0.8
+        similarity_threshold=SIMILARITY_THRESHOLD
     )
+    cache.similarity_evaluation = ScoreRecordingEvaluation(cache.similarity_evaluation)
     print("✅ Cache initialized with Redis Cloud Enterprise")
 
 
-@cache.cache()
+def exact_cache_key(model, prompt):
+    """Hash model and prompt for the exact-match tier (xxh3 when available)"""
+    data = f"{model}:{prompt}".encode()
+    if HAS_XXHASH:
+        return xxhash.xxh3_128_hexdigest(data)
+    return hashlib.sha256(data).hexdigest()
+
+
 def call_ollama(model, prompt):
-    """Call Ollama API with automatic caching"""
+    """Call Ollama API, checking the exact-match tier before the semantic cache"""
+    key = exact_cache_key(model, prompt)
+    
+    with _exact_lock:
+        if key in _exact:
+            _exact.move_to_end(key)
+            print("⚡ Exact cache HIT")
+            return _exact[key]
+    
+    _lookup.scores = []
+    try:
+        result = _call_ollama_semantic(model, prompt)
+    finally:
+        scores, _lookup.scores = _lookup.scores, None
+    # Logged on every lookup so CACHE_SIM_THRESHOLD can be re-tuned from traffic
+    if scores:
+        print(f"📏 Semantic lookup best score {max(scores):.3f} (threshold {SIMILARITY_THRESHOLD})")
+    else:
+        print("📏 Semantic lookup found no candidates")
+    if isinstance(result, str) and result.startswith("Error:"):
+        return result
+    
+    with _exact_lock:
+        _exact[key] = result
+        _exact.move_to_end(key)
+        if len(_exact) > EXACT_CACHE_SIZE:
+            _exact.popitem(last=False)
+    return result
+
+
+@cache.cache()
+def _call_ollama_semantic(model, prompt):
+    """Call Ollama API with automatic semantic caching"""
     print("🔥 Cache MISS - Calling Ollama API")
     
     try:
-        response = requests.post(
+        response = SESSION.post(
             'http://localhost:11434/api/generate',
             json={
                 'model': model,
@@ -58,7 +259,7 @@ def test_cache_system():
     
     print("🧪 Testing distributed LLM cache system...")
     print(f"📊 Model: {model_name}")
-    print(f"🎯 Cache threshold: 0.8 similarity")
+    print(f"🎯 Cache threshold: {SIMILARITY_THRESHOLD} similarity")
     print("-" * 50)
     
     # Test 1: First query (cache miss expected)
@@ -95,7 +296,7 @@ def main():
     
     try:
         # Check if model exists
-        response = requests.get('http://localhost:11434/api/tags', timeout=10)
+        response = SESSION.get('http://localhost:11434/api/tags', timeout=10)
         if response.status_code == 200:
             models = [m['name'] for m in response.json().get('models', [])]
             if model_name not in models:
@@ -117,7 +318,7 @@ def main():
     print("\n🎯 System Status:")
     print("   - Ollama LLM engine: Ready")
     print("   - Redis Cloud cache: Connected") 
-    print("   - Semantic similarity: 0.8 threshold")
+    print(f"   - Semantic similarity: {SIMILARITY_THRESHOLD} threshold")
     print("   - Cost optimization: Active")
     print("\n🔗 Repository: https://github.com/jleechan2015/llm_selfhost")
 
@@ -6,22 +6,40 @@ Local Claude Code CLI compatible proxy that forwards to vast.ai backend.
 import os
 import json
 import time
-import requests
+from typing import AsyncIterator
+from contextlib import asynccontextmanager
+import httpx
 from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
 import uvicorn
 
-app = FastAPI()
+from claude_tools_base import ORJSONResponse, json_loads
 
 # Configuration
 VAST_API_URL = "http://localhost:8000"  # Your SSH tunnel
 LOCAL_PORT = 8001  # Different port to avoid conflict
+WEB_WORKERS = int(os.getenv('WEB_WORKERS', 4))
+
+# Shared async client so concurrent requests overlap on backend I/O and
+# reuse keep-alive connections through the tunnel
+client = httpx.AsyncClient(
+    timeout=60,
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await client.aclose()
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
     try:
-        response = requests.get(f"{VAST_API_URL}/health", timeout=5)
+        response = await client.get(f"{VAST_API_URL}/health", timeout=5)
         return {
             "status": "healthy",
             "vast_backend": "connected" if response.status_code == 200 else "disconnected",
@@ -46,26 +64,62 @@ async def list_models():
         ]
     }
 
+async def relay_stream(upstream: httpx.Response) -> AsyncIterator[bytes]:
+    """Relay backend bytes as they arrive, releasing the pooled connection
+    however the stream ends"""
+    try:
+        async for chunk in upstream.aiter_raw():
+            yield chunk
+    finally:
+        await upstream.aclose()
+
 @app.post("/v1/messages")
 async def create_message(request: Request):
     """Forward messages to vast.ai backend"""
     try:
-        body = await request.json()
+        body = json_loads(await request.body())
+        
+        if body.get("stream"):
+            # Relay backend bytes as they arrive instead of buffering the completion
+            upstream = await client.send(
+                client.build_request(
+                    "POST",
+                    f"{VAST_API_URL}/v1/messages",
+                    json=body,
+                    headers={"Content-Type": "application/json"}
+                ),
+                stream=True
+            )
+            try:
+                if upstream.status_code != 200:
+                    detail = (await upstream.aread()).decode(errors="replace")
+                    raise HTTPException(status_code=upstream.status_code, detail=detail)
+                # The generator closes the upstream response when it runs to the
+                # end; the background task also covers a body that never starts
+                return StreamingResponse(
+                    relay_stream(upstream),
+                    media_type=upstream.headers.get("content-type", "text/event-stream"),
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+                    background=BackgroundTask(upstream.aclose)
+                )
+            except BaseException:
+                await upstream.aclose()
+                raise
         
         # Forward to your vast.ai proxy
-        response = requests.post(
+        response = await client.post(
             f"{VAST_API_URL}/v1/messages",
             json=body,
-            headers={"Content-Type": "application/json"},
-            timeout=60
+            headers={"Content-Type": "application/json"}
         )
         
         if response.status_code == 200:
-            return response.json()
+            # Already Anthropic-format JSON; relay the bytes without re-encoding
+            return Response(content=response.content, media_type="application/json")
         else:
             raise HTTPException(status_code=response.status_code, detail=response.text)
             
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         raise HTTPException(status_code=500, detail=f"Request to vast.ai backend failed: {str(e)}") from e
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Proxy error: {str(e)}") from e
@@ -73,4 +127,12 @@ async def create_message(request: Request):
 if __name__ == "__main__":
     print(f"🚀 Starting Claude Code Proxy on port {LOCAL_PORT}")
     print(f"📡 Forwarding to vast.ai backend: {VAST_API_URL}")
-    uvicorn.run(app, host="127.0.0.1", port=LOCAL_PORT)
\ No newline at end of file
+    # Import string so uvicorn can spawn workers; uvicorn[standard] supplies
+    # uvloop + httptools, which the default "auto" loop/http settings pick up
+    uvicorn.run(
+        "local_claude_proxy:app",
+        host="127.0.0.1",
+        port=LOCAL_PORT,
+        workers=WEB_WORKERS,
+        backlog=2048
+    )
\ No newline at end of file
@@ -10,23 +10,33 @@ import sys
 import json
 import time
 import hashlib
-import traceback
+import re
+import subprocess
 import logging
-from typing import Dict, List, Any, Optional, Union
+import asyncio
+from typing import Dict, List, Any, Optional, AsyncIterator
 from datetime import datetime
+from contextlib import asynccontextmanager
 
 # Core dependencies only
 from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from pydantic import BaseModel, ValidationError
 import uvicorn
-import requests
+import httpx
 
 # Import base tool classes
-from claude_tools_base import ToolExecutionMixin
+from claude_tools_base import (
+    ToolExecutionMixin, RequestCoalescer, ORJSONResponse, next_id, run_shell_command,
+    json_dumps, json_loads, sse_event, text_delta
+)
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
+# httpx logs every backend request at INFO
+logging.getLogger("httpx").setLevel(logging.WARNING)
 logger = logging.getLogger(__name__)
 
 print("🏠 Starting Tool-Enabled Local LM Studio Proxy Server...")
@@ -37,6 +47,12 @@ LM_STUDIO_HOST = os.getenv('LM_STUDIO_HOST', 'localhost')
 LM_STUDIO_PORT = int(os.getenv('LM_STUDIO_PORT', 1234))
 LM_STUDIO_MODEL = os.getenv('LM_STUDIO_MODEL', 'qwen/qwen3-coder-30b')
 API_PORT = int(os.getenv('API_PORT', 8001))
+WEB_WORKERS = int(os.getenv('WEB_WORKERS', 4))
+
+HEALTH_CACHE_TTL = float(os.getenv('HEALTH_CACHE_TTL', 3))
+MODELS_CACHE_TTL = float(os.getenv('MODELS_CACHE_TTL', 30))
+COALESCE_WINDOW_MS = float(os.getenv('COALESCE_WINDOW_MS', 0))
+COALESCE_MAX_BATCH = int(os.getenv('COALESCE_MAX_BATCH', 8))
 
 LM_STUDIO_BASE_URL = f"http://{LM_STUDIO_HOST}:{LM_STUDIO_PORT}/v1"
 
@@ -44,12 +60,32 @@ print(f"✅ LM Studio configuration:")
 print(f"🌐 LM Studio: {LM_STUDIO_BASE_URL}")
 print(f"📱 Model: {LM_STUDIO_MODEL}")
 
+# Health/status timestamps only need second resolution, so format once per second
+_iso_cache = (0, "")
+
+def iso_timestamp() -> str:
+    """Current local time in ISO format, cached for the current second"""
+    global _iso_cache
+    second = int(time.time())
+    if _iso_cache[0] != second:
+        _iso_cache = (second, datetime.fromtimestamp(second).isoformat())
+    return _iso_cache[1]
+
 class LocalToolsProxy(ToolExecutionMixin):
     """Local LM Studio proxy with tool execution capabilities"""
     
     def __init__(self):
         super().__init__()
-        print(f"🏠 Local Tools Proxy initialized with session: {self.tools.session_id}")
+        logger.info("🏠 Local Tools Proxy initialized with session: %s", self.tools.session_id)
+
+# Blocked bash substrings, compiled into one case-insensitive alternation
+DANGEROUS_COMMANDS = [
+    'rm -rf /', 'rm -rf *', 'format', 'fdisk', 'mkfs',
+    'dd if=', ':(){ :|:& };:', 'chmod -R 777 /',
+    'chown -R', 'passwd', 'sudo su', 'su -',
+    'curl http://169.254.169.254'  # Block metadata access
+]
+DANGEROUS_COMMAND_RE = re.compile("|".join(map(re.escape, DANGEROUS_COMMANDS)), re.IGNORECASE)
 
 # Legacy class name for compatibility
 class ClaudeCodeTools:
@@ -57,32 +93,24 @@ class ClaudeCodeTools:
     
     def __init__(self):
         self.temp_files = {}
-        self.session_id = str(uuid.uuid4())
-        print(f"🔧 Tools session: {self.session_id}")
+        self.session_id = next_id("s")
+        logger.debug("🔧 Tools session: %s", self.session_id)
         
     def bash(self, command: str) -> Dict[str, Any]:
         """Execute bash commands with security checks"""
         
         # Security checks
-        dangerous_commands = [
-            'rm -rf /', 'rm -rf *', 'format', 'fdisk', 'mkfs',
-            'dd if=', ':(){ :|:& };:', 'chmod -R 777 /',
-            'chown -R', 'passwd', 'sudo su', 'su -',
-            'curl http://169.254.169.254'  # Block metadata access
-        ]
-        
-        command_lower = command.lower()
-        for dangerous in dangerous_commands:
-            if dangerous in command_lower:
-                return {
-                    "type": "bash",
-                    "exit_code": 1,
-                    "stdout": "",
-                    "stderr": f"Security: Dangerous command blocked: {dangerous}"
-                }
+        match = DANGEROUS_COMMAND_RE.search(command)
+        if match:
+            return {
+                "type": "bash",
+                "exit_code": 1,
+                "stdout": "",
+                "stderr": f"Security: Dangerous command blocked: {match.group(0)}"
+            }
         
         try:
-            print(f"🔧 Executing bash: {command}")
+            logger.debug("🔧 Executing bash: %s", command)
             
             # Limit command length
             if len(command) > 1000:
@@ -93,23 +121,16 @@ class ClaudeCodeTools:
                     "stderr": "Command too long (max 1000 characters)"
                 }
             
-            result = subprocess.run(
-                command,
-                shell=True,
-                capture_output=True,
-                text=True,
-                timeout=30,
-                cwd=os.getcwd(),
-                env=dict(os.environ, PATH=os.environ.get('PATH', ''))
-            )
+            # Own process group, so a timeout kills the command's children too
+            exit_code, stdout, stderr = run_shell_command(command)
             
-            print(f"✅ Bash result: exit_code={result.returncode}")
+            logger.debug("✅ Bash result: exit_code=%s", exit_code)
             
             return {
                 "type": "bash",
-                "exit_code": result.returncode,
-                "stdout": result.stdout,
-                "stderr": result.stderr
+                "exit_code": exit_code,
+                "stdout": stdout,
+                "stderr": stderr
             }
         except subprocess.TimeoutExpired:
             return {
@@ -133,16 +154,16 @@ class ClaudeCodeTools:
         
         if command == "create":
             try:
-                print(f"📝 Creating file: {path}")
+                logger.debug("📝 Creating file: %s", path)
                 with open(path, 'w') as f:
                     f.write(file_text or "")
-                print(f"✅ File created successfully: {path}")
+                logger.debug("✅ File created successfully: %s", path)
                 return {
                     "type": "str_replace_editor",
                     "result": f"File created successfully at: {path}"
                 }
             except Exception as e:
-                print(f"❌ Failed to create file {path}: {e}")
+                logger.warning("❌ Failed to create file %s: %s", path, e)
                 return {
                     "type": "str_replace_editor",
                     "error": f"Failed to create file: {str(e)}"
@@ -184,7 +205,7 @@ class ClaudeCodeTools:
                 with open(path, 'w') as f:
                     f.write(new_content)
                 
-                print(f"✅ String replaced in {path}")
+                logger.debug("✅ String replaced in %s", path)
                 return {
                     "type": "str_replace_editor",
                     "result": f"String replaced successfully in {path}"
@@ -200,23 +221,43 @@ class ClaudeCodeTools:
     def write_file(self, path: str, content: str) -> Dict[str, Any]:
         """Direct file write tool for Claude Code CLI compatibility"""
         try:
-            print(f"📝 Writing file: {path}")
+            logger.debug("📝 Writing file: %s", path)
             with open(path, 'w') as f:
                 f.write(content)
-            print(f"✅ File written successfully: {path}")
+            logger.debug("✅ File written successfully: %s", path)
             return {
                 "type": "write_file",
                 "result": f"File written successfully at: {path}"
             }
         except Exception as e:
-            print(f"❌ Failed to write file {path}: {e}")
+            logger.warning("❌ Failed to write file %s: %s", path, e)
             return {
                 "type": "write_file",
                 "error": f"Failed to write file: {str(e)}"
             }
 
+# Shared async HTTP client for LM Studio (keep-alive connection pool),
+# used by every endpoint that talks to the backend
+http_client = httpx.AsyncClient(
+    timeout=60,
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
+)
+
+coalescer = RequestCoalescer(http_client, COALESCE_WINDOW_MS / 1000, COALESCE_MAX_BATCH)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await coalescer.aclose()
+    await http_client.aclose()
+
 # Initialize FastAPI app
-app = FastAPI(title="Tool-Enabled Local LM Studio Proxy", version="1.0.0")
+app = FastAPI(
+    title="Tool-Enabled Local LM Studio Proxy",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
+)
 
 # Add CORS middleware
 app.add_middleware(
@@ -226,38 +267,151 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Compress large JSON bodies; Starlette >= 0.46 (see requirements.txt)
+# leaves text/event-stream untouched
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=1)
 
 # Initialize tools
 proxy = LocalToolsProxy()
 
+# Last LM Studio probe result, reused by /health for HEALTH_CACHE_TTL seconds
+_health_cache = {"ts": 0.0, "status": "unknown"}
+
+# LM Studio's model list rarely changes; serve it from memory between refreshes
+_models_cache = {"expires": 0.0, "body": None}
+_models_lock = asyncio.Lock()
+
+class MessagesRequest(BaseModel):
+    """The /v1/messages fields this proxy forwards; other keys are ignored"""
+    messages: List[Dict[str, Any]] = []
+    max_tokens: int = 1000
+    temperature: float = 0.7
+    stream: bool = False
+
 def should_use_tools(content: str) -> bool:
     return proxy.should_use_tools(content)
 
 def extract_tool_requests(content: str) -> List[Dict]:
     return proxy.extract_tool_requests(content)
 
-def execute_tools(tool_requests: List[Dict]) -> str:
-    return proxy.execute_tools(tool_requests)
+def detect_and_extract_tools(content: str) -> Optional[List[Dict]]:
+    return proxy.detect_and_extract_tools(content)
+
+async def execute_tools(tool_requests: List[Dict]) -> str:
+    # Tools block (subprocess, file I/O); keep them off the event loop
+    return await proxy.aexecute_tools(tool_requests)
+
+async def stream_lm_studio_response(lm_studio_request: Dict[str, Any]) -> AsyncIterator[str]:
+    """Relay LM Studio SSE chunks as Anthropic stream events as they arrive
+    
+    Text is accumulated so tool detection and execution can run once the
+    final chunk is in; tool output is sent as a trailing text delta.
+    """
+    yield sse_event("message_start", {
+        "type": "message_start",
+        "message": {
+            "id": next_id("msg_"),
+            "type": "message",
+            "role": "assistant",
+            "content": [],
+            "model": "claude-3-5-sonnet-20241022",
+            "stop_reason": None,
+            "stop_sequence": None,
+            "usage": {"input_tokens": 0, "output_tokens": 0}
+        }
+    })
+    yield sse_event("content_block_start", {
+        "type": "content_block_start",
+        "index": 0,
+        "content_block": {"type": "text", "text": ""}
+    })
+    
+    parts = []
+    usage = {}
+    try:
+        async with http_client.stream(
+            "POST",
+            f"{LM_STUDIO_BASE_URL}/chat/completions",
+            headers={
+                "Content-Type": "application/json",
+                "Authorization": "Bearer lm-studio"
+            },
+            json={**lm_studio_request, "stream": True}
+        ) as response:
+            if response.status_code != 200:
+                error_text = (await response.aread()).decode(errors="replace")
+                logger.error("LM Studio error: %s - %s", response.status_code, error_text)
+                yield sse_event("error", {
+                    "type": "error",
+                    "error": {"type": "api_error", "message": error_text}
+                })
+                return
+            
+            async for line in response.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
+                data = line[6:].strip()
+                if data == "[DONE]":
+                    break
+                try:
+                    chunk = json_loads(data)
+                except json.JSONDecodeError:
+                    logger.warning("Failed to parse streaming chunk: %.200s", data)
+                    continue
+                
+                usage = chunk.get("usage") or usage
+                choices = chunk.get("choices") or [{}]
+                text = choices[0].get("delta", {}).get("content")
+                if text:
+                    parts.append(text)
+                    yield text_delta(text)
+    except httpx.HTTPError as e:
+        logger.error("❌ LM Studio stream failed: %s", e)
+        yield sse_event("error", {
+            "type": "error",
+            "error": {"type": "api_error", "message": f"LM Studio service unavailable: {str(e)}"}
+        })
+        return
+    
+    content = "".join(parts)
+    tool_requests = detect_and_extract_tools(content)
+    if tool_requests is not None:
+        logger.debug("🔧 Tool execution triggered")
+        if tool_requests:
+            tool_results = await execute_tools(tool_requests)
+            yield text_delta(tool_results)
+            logger.debug("✅ Tools executed: %d operations", len(tool_requests))
+    
+    logger.debug("✅ Stream complete (%d chars)", len(content))
+    yield sse_event("content_block_stop", {"type": "content_block_stop", "index": 0})
+    yield sse_event("message_delta", {
+        "type": "message_delta",
+        "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+        "usage": {"output_tokens": usage.get("completion_tokens", 0)}
+    })
+    yield sse_event("message_stop", {"type": "message_stop"})
 
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
     
-    # Check LM Studio connection
-    lm_studio_status = "unknown"
-    try:
-        response = requests.get(f"{LM_STUDIO_BASE_URL}/models", timeout=5)
-        if response.status_code == 200:
-            lm_studio_status = "healthy"
-        else:
-            lm_studio_status = f"error_{response.status_code}"
-    except Exception as e:
-        lm_studio_status = f"unreachable"
+    # Check LM Studio connection, at most once per HEALTH_CACHE_TTL seconds
+    if time.monotonic() - _health_cache["ts"] >= HEALTH_CACHE_TTL:
+        try:
+            response = await http_client.get(f"{LM_STUDIO_BASE_URL}/models", timeout=5)
+            if response.status_code == 200:
+                _health_cache["status"] = "healthy"
+            else:
+                _health_cache["status"] = f"error_{response.status_code}"
+        except Exception as e:
+            _health_cache["status"] = f"unreachable"
+        _health_cache["ts"] = time.monotonic()
+    lm_studio_status = _health_cache["status"]
     
-    return JSONResponse({
+    return ORJSONResponse({
         "status": "healthy",
-        "timestamp": datetime.now().isoformat(),
+        "timestamp": iso_timestamp(),
         "local_tools_proxy": "active",
         "tools_enabled": True,
         "components": {
@@ -272,60 +426,66 @@ async def health_check():
         }
     })
 
+# Served when the backend model list is unavailable; encoded once at import
+FALLBACK_MODELS_BODY = json_dumps({
+    "object": "list",
+    "data": [
+        {
+            "id": "claude-3-5-sonnet-20241022",
+            "object": "model",
+            "created": int(time.time()),
+            "owned_by": "anthropic",
+            "type": "text"
+        },
+        {
+            "id": LM_STUDIO_MODEL,
+            "object": "model",
+            "created": int(time.time()),
+            "owned_by": "lm-studio",
+            "type": "text"
+        }
+    ]
+}).encode()
+
 @app.get("/v1/models")
 async def list_models():
     """List available models"""
+    if time.monotonic() < _models_cache["expires"]:
+        return Response(content=_models_cache["body"], media_type="application/json")
+    
     try:
-        response = requests.get(f"{LM_STUDIO_BASE_URL}/models", timeout=10)
+        async with _models_lock:
+            # Another request may have refreshed the cache while we waited
+            if time.monotonic() >= _models_cache["expires"]:
+                response = await http_client.get(f"{LM_STUDIO_BASE_URL}/models", timeout=10)
+                if response.status_code == 200:
+                    _models_cache["body"] = response.content
+                    _models_cache["expires"] = time.monotonic() + MODELS_CACHE_TTL
         
-        if response.status_code == 200:
-            return JSONResponse(response.json())
+        if time.monotonic() < _models_cache["expires"]:
+            return Response(content=_models_cache["body"], media_type="application/json")
         else:
             # Return fallback model list
-            return JSONResponse({
-                "object": "list",
-                "data": [
-                    {
-                        "id": "claude-3-5-sonnet-20241022",
-                        "object": "model",
-                        "created": int(time.time()),
-                        "owned_by": "anthropic",
-                        "type": "text"
-                    },
-                    {
-                        "id": LM_STUDIO_MODEL,
-                        "object": "model", 
-                        "created": int(time.time()),
-                        "owned_by": "lm-studio",
-                        "type": "text"
-                    }
-                ]
-            })
+            return Response(content=FALLBACK_MODELS_BODY, media_type="application/json")
             
     except Exception as e:
         logger.error(f"Failed to get models: {e}")
-        # Return basic model list as fallback
-        return JSONResponse({
-            "object": "list",
-            "data": [
-                {
-                    "id": "claude-3-5-sonnet-20241022",
-                    "object": "model",
-                    "created": int(time.time()),
-                    "owned_by": "anthropic",
-                    "type": "text"
-                }
-            ]
-        })
+        # Return fallback model list
+        return Response(content=FALLBACK_MODELS_BODY, media_type="application/json")
 
 @app.post("/v1/messages")
 async def create_message(request: Request):
     """Create message with tool execution support"""
     try:
-        request_data = await request.json()
-        messages = request_data.get("messages", [])
+        # Parsed and validated in one pass by pydantic-core
+        body = MessagesRequest.model_validate_json(await request.body())
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        messages = body.messages
         
-        print(f"📨 Request: {len(messages)} messages")
+        logger.debug("📨 Request: %d messages", len(messages))
         
         # Forward to LM Studio
         try:
@@ -336,37 +496,43 @@ async def create_message(request: Request):
             lm_studio_request = {
                 "model": LM_STUDIO_MODEL,
                 "messages": enhanced_messages,
-                "max_tokens": request_data.get("max_tokens", 1000),
-                "temperature": request_data.get("temperature", 0.7),
+                "max_tokens": body.max_tokens,
+                "temperature": body.temperature,
                 "stream": False
             }
             
-            print(f"🔄 Forwarding to LM Studio: {LM_STUDIO_BASE_URL}")
+            logger.debug("🔄 Forwarding to LM Studio: %s", LM_STUDIO_BASE_URL)
+            
+            if body.stream:
+                return StreamingResponse(
+                    stream_lm_studio_response(lm_studio_request),
+                    media_type="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+                )
             
-            response = requests.post(
+            response = await coalescer.post(
                 f"{LM_STUDIO_BASE_URL}/chat/completions",
                 headers={
                     "Content-Type": "application/json",
                     "Authorization": "Bearer lm-studio"
                 },
-                json=lm_studio_request,
-                timeout=60
+                json=lm_studio_request
             )
             
             if response.status_code != 200:
-                logger.error(f"LM Studio error: {response.status_code} - {response.text}")
+                logger.error("LM Studio error: %s - %s", response.status_code, response.text)
                 raise HTTPException(
                     status_code=response.status_code,
                     detail=response.text
                 )
             
-            lm_studio_response = response.json()
+            lm_studio_response = json_loads(response.content)
             
             # Convert to Anthropic format
             content = lm_studio_response["choices"][0]["message"]["content"]
             
             anthropic_response = {
-                "id": f"msg_{int(time.time())}",
+                "id": next_id("msg_"),
                 "type": "message",
                 "role": "assistant",
                 "content": [
@@ -383,30 +549,28 @@ async def create_message(request: Request):
                 }
             }
             
-            # Check if we should execute tools
-            if should_use_tools(content):
-                print("🔧 Tool execution triggered")
+            # Detect and extract tools in one pass over the completion
+            tool_requests = detect_and_extract_tools(content)
+            if tool_requests is not None:
+                logger.debug("🔧 Tool execution triggered")
                 
-                # Extract and execute tools
-                tool_requests = extract_tool_requests(content)
                 if tool_requests:
-                    tool_results = execute_tools(tool_requests)
+                    tool_results = await execute_tools(tool_requests)
                     
                     # Enhance response with tool results
                     enhanced_content = content + tool_results
                     anthropic_response["content"][0]["text"] = enhanced_content
-                    print(f"✅ Tools executed: {len(tool_requests)} operations")
+                    logger.debug("✅ Tools executed: %d operations", len(tool_requests))
             
-            print(f"✅ Response ready ({len(content)} chars)")
-            return JSONResponse(anthropic_response)
+            logger.debug("✅ Response ready (%d chars)", len(content))
+            return ORJSONResponse(anthropic_response)
             
-        except requests.exceptions.RequestException as e:
-            print(f"❌ LM Studio request failed: {e}")
+        except httpx.HTTPError as e:
+            logger.error("❌ LM Studio request failed: %s", e)
             raise HTTPException(status_code=503, detail=f"LM Studio service unavailable: {str(e)}")
             
     except Exception as e:
-        print(f"❌ Error processing request: {e}")
-        traceback.print_exc()
+        logger.exception("❌ Error processing request: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 if __name__ == "__main__":
@@ -419,4 +583,14 @@ if __name__ == "__main__":
     print("\nReady for Claude Code CLI integration!")
     print("=" * 40)
     
-    uvicorn.run(app, host="127.0.0.1", port=API_port)
\ No newline at end of file
+    # Import string so uvicorn can spawn workers
+    uvicorn.run(
+        "local_tools_proxy:app",
+        host="127.0.0.1",
+        port=API_PORT,
+        workers=WEB_WORKERS,
+        backlog=2048,
+        loop="uvloop" if sys.platform != "win32" else "auto",
+        http="httptools",
+        log_level="warning"
+    )
\ No newline at end of file
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Helpers shared by the red/green proxy comparison tests: source inspection
+and per-thread output buffering for tests run concurrently
+"""
+
+import io
+import re
+import sys
+import threading
+from collections import namedtuple
+from functools import lru_cache
+from pathlib import Path
+
+Info = namedtuple("Info", "lines has_tools has_bash has_file_tools")
+
+# "ClaudeCodeTools", "bash(" and "str_replace_editor" found in one scan
+TOKEN_RE = re.compile(r"ClaudeCodeTools|bash\(|str_replace_editor")
+
+
+@lru_cache(maxsize=None)
+def analyze(path):
+    """Line count and tool markers of a proxy source, scanned once per run
+
+    Raises FileNotFoundError if the file does not exist.
+    """
+    content = Path(path).read_text()
+    # Same as len(content.splitlines()) without building the list
+    lines = content.count("\n") + (0 if not content or content.endswith("\n") else 1)
+    found = set(TOKEN_RE.findall(content))
+    return Info(
+        lines=lines,
+        has_tools="ClaudeCodeTools" in found,
+        has_bash="bash(" in found,
+        has_file_tools="str_replace_editor" in found,
+    )
+
+
+class ThreadBufferedStdout:
+    """sys.stdout stand-in that holds each worker thread's prints in its own
+    buffer, so concurrently run tests don't interleave their output"""
+    
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+    
+    def write(self, text):
+        return getattr(self.local, "buffer", self.stream).write(text)
+    
+    def flush(self):
+        self.stream.flush()
+
+
+def run_buffered(test_name, test_func):
+    """Run one test on a worker thread, returning its result and output"""
+    buffer = sys.stdout.local.buffer = io.StringIO()
+    try:
+        result = test_func()
+    except Exception as e:
+        print(f"❌ {test_name} failed with exception: {e}")
+        result = False
+    finally:
+        del sys.stdout.local.buffer
+    return result, buffer.getvalue()
@@ -24,8 +24,15 @@ curl -fsSL https://ollama.com/install.sh | sh
 
 # Start Ollama server in background
 echo "🔄 Starting Ollama server..."
-nohup ollama serve > /tmp/ollama.log 2>&1 &
-sleep 10
+OLLAMA_NUM_PARALLEL=${OLLAMA_NUM_PARALLEL:-4} nohup ollama serve > /tmp/ollama.log 2>&1 &
+
+# Poll until Ollama answers: 1s, 2s, 4s, then every 8s, for up to 60s
+delay=1
+deadline=$((SECONDS + 60))
+until curl -s http://localhost:11434/api/tags > /dev/null || [ $SECONDS -ge $deadline ]; do
+    sleep $delay
+    delay=$((delay * 2 > 8 ? 8 : delay * 2))
+done
 
 # Verify Ollama is running
 if curl -s http://localhost:11434/api/tags > /dev/null; then
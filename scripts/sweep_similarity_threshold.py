@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Sweep the semantic cache similarity threshold over labeled prompt pairs
+
+Input is a JSONL file with one pair per line:
+    {"a": "first prompt", "b": "second prompt", "same": true}
+
+"same" marks pairs that should be served the same cached answer. For each
+threshold the script reports precision/recall/F1 of treating
+cosine(a, b) >= threshold as a cache hit. Use the result to set
+CACHE_SIM_THRESHOLD for llm_cache_app.py.
+"""
+
+import sys
+import json
+import argparse
+
+from sentence_transformers import SentenceTransformer
+
+
+def load_pairs(path):
+    """Load labeled prompt pairs from a JSONL file"""
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("pairs", help="JSONL file of labeled prompt pairs")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--start", type=float, default=0.70)
+    parser.add_argument("--stop", type=float, default=0.95)
+    parser.add_argument("--step", type=float, default=0.01)
+    args = parser.parse_args()
+
+    pairs = load_pairs(args.pairs)
+    if not pairs:
+        print("❌ No pairs found")
+        return 1
+
+    model = SentenceTransformer(args.model)
+    a = model.encode([p["a"] for p in pairs], normalize_embeddings=True)
+    b = model.encode([p["b"] for p in pairs], normalize_embeddings=True)
+    scores = (a * b).sum(axis=1)
+    labels = [bool(p["same"]) for p in pairs]
+
+    print(f"📊 {len(pairs)} pairs, model {args.model}")
+    print(f"{'threshold':>9} {'precision':>9} {'recall':>7} {'f1':>6}")
+
+    best = (0.0, args.start)
+    steps = int(round((args.stop - args.start) / args.step)) + 1
+    for i in range(steps):
+        threshold = round(args.start + i * args.step, 4)
+        tp = sum(1 for s, y in zip(scores, labels) if s >= threshold and y)
+        fp = sum(1 for s, y in zip(scores, labels) if s >= threshold and not y)
+        fn = sum(1 for s, y in zip(scores, labels) if s < threshold and y)
+        precision = tp / (tp + fp) if tp + fp else 1.0
+        recall = tp / (tp + fn) if tp + fn else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        print(f"{threshold:>9.2f} {precision:>9.3f} {recall:>7.3f} {f1:>6.3f}")
+        if f1 > best[0]:
+            best = (f1, threshold)
+
+    print(f"\n🎯 Best F1 {best[0]:.3f} at threshold {best[1]:.2f}")
+    print(f"💡 export CACHE_SIM_THRESHOLD={best[1]:.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,17 +4,27 @@
 
 set -e # Exit immediately if a command fails
 
-echo ">> 1. Installing dependencies..."
-pip install ollama redis fastapi uvicorn requests
+echo ">> 1. Installing dependencies in the background..."
+# Runs while Ollama installs and the model downloads; --no-cache-dir skips
+# writing a wheel cache nobody reuses on a fresh instance
+pip install --no-cache-dir ollama redis fastapi "uvicorn[standard]" requests httpx orjson &
+PIP_PID=$!
 
 echo ">> 2. Setting up and starting Ollama..."
 curl -fsSL https://ollama.com/install.sh | sh
-ollama serve &
-sleep 5 # Give the server a moment to start up
+OLLAMA_NUM_PARALLEL=${OLLAMA_NUM_PARALLEL:-4} ollama serve &
+# Wait for the server with backoff (1s, 2s, 4s, then 8s) instead of a fixed sleep
+delay=1
+deadline=$((SECONDS + 60))
+until curl -s http://localhost:11434/api/tags > /dev/null || [ $SECONDS -ge $deadline ]; do
+    sleep $delay
+    delay=$((delay * 2 > 8 ? 8 : delay * 2))
+done
 
-echo ">> 3. Pulling the LLM model..."
+echo ">> 3. Pulling the LLM model in the background..."
 # Using qwen3-coder as specified (30B model, 19GB)
-ollama pull qwen3-coder
+ollama pull qwen3-coder &
+PULL_PID=$!
 
 echo ">> 4. Cloning your application repository..."
 # The GIT_REPO environment variable is passed in by the 'vastai create' command.
@@ -23,7 +33,12 @@ if [ \! -d "/app" ]; then
 fi
 cd /app
 
-echo ">> 5. Launching the Tool-Enabled API proxy..."
+echo ">> 5. Waiting for dependencies and model download..."
+# wait returns the job's exit status, so set -e still stops on a failure
+wait $PIP_PID
+wait $PULL_PID
+
+echo ">> 6. Launching the Tool-Enabled API proxy..."
 # Launch the tool-enabled API proxy that bridges Anthropic API to Ollama with tool execution
 python3 vast_tools_proxy.py
 EOF < /dev/null
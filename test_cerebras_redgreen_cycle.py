@@ -6,174 +6,211 @@ This script runs both the red test (demonstrating the problem) and the green tes
 (demonstrating the fix) to show the complete before/after behavior for Cerebras integration.
 """
 
-import subprocess
+import asyncio
 import sys
-import time
 
-def run_test_script(script_name, description):
-    """Run a test script and capture its output"""
-    print(f"\n{'='*80}")
-    print(f"🧪 RUNNING: {description}")
-    print(f"📄 Script: {script_name}")
-    print(f"{'='*80}")
+async def run_test_script(script_name, description):
+    """Run a test script, returning whether it passed and its report"""
+    lines = [
+        f"\n{'='*80}",
+        f"🧪 RUNNING: {description}",
+        f"📄 Script: {script_name}",
+        f"{'='*80}",
+    ]
     
     try:
-        result = subprocess.run([sys.executable, script_name], 
-                              capture_output=True, text=True, timeout=30)
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, script_name,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            # communicate() drains both pipes, so a chatty child can't block
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=30)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            lines.append("❌ Test timed out after 30 seconds")
+            return False, "\n".join(lines)
         
-        print(result.stdout)
-        if result.stderr:
-            print("STDERR:", result.stderr)
+        lines.append(stdout.decode(errors="replace"))
+        if stderr:
+            lines.append(f"STDERR: {stderr.decode(errors='replace')}")
         
-        return result.returncode == 0
-    except subprocess.TimeoutExpired:
-        print("❌ Test timed out after 30 seconds")
-        return False
+        return process.returncode == 0, "\n".join(lines)
     except FileNotFoundError:
-        print(f"❌ Test script not found: {script_name}")
-        return False
+        lines.append(f"❌ Test script not found: {script_name}")
+        return False, "\n".join(lines)
     except Exception as e:
-        print(f"❌ Error running test: {e}")
-        return False
+        lines.append(f"❌ Error running test: {e}")
+        return False, "\n".join(lines)
+
+async def run_red_and_green():
+    """Run the red and green scripts side by side; they only read files"""
+    return await asyncio.gather(
+        run_test_script("test_claude_cerebras_tools_red.py",
+                        "RED TEST - Demonstrating claude-cerebras tool limitations"),
+        run_test_script("test_claude_cerebras_tools_green.py",
+                        "GREEN TEST - Verifying claude-cerebras tool execution fix")
+    )
+
+# Static report sections, joined once instead of printed line by line
+HEADER_BLOCK = "\n".join([
+    "🧠 CLAUDE-CEREBRAS TOOL EXECUTION: RED/GREEN TEST CYCLE",
+    "=" * 80,
+    "",
+    "This demonstrates the complete fix for claude-cerebras tool execution:",
+    "  🔴 RED TEST: Shows the original broken behavior",
+    "  🔧 FIX: Implementation of tool-enabled Cerebras proxy",
+    "  🟢 GREEN TEST: Shows the fixed behavior",
+    "",
+    "Problem: claude-cerebras couldn't create files or execute tools",
+    "Solution: Replace cerebras_proxy_simple.py with cerebras_tools_proxy.py",
+    "",
+    "🧠 Cerebras Advantages after fix:",
+    "  - 480B parameter qwen-3-coder model (massive scale)",
+    "  - Pay-per-token pricing (no infrastructure costs)",
+    "  - Full tool execution (bash, file creation, editing)",
+    "  - Zero setup required (just need API key)",
+    "  - Built-in rate limiting and retry logic",
+    "",
+    "Running the red and green tests...",
+])
+
+FIX_BLOCK = "\n".join([
+    "\n" + "=" * 80,
+    "🔧 THE CEREBRAS FIX HAS BEEN IMPLEMENTED",
+    "=" * 80,
+    "",
+    "Key changes made:",
+    "  1. ✅ Created cerebras_tools_proxy.py (tool-enabled Cerebras proxy)",
+    "  2. ✅ Modified claude-cerebras to use cerebras_tools_proxy.py",
+    "  3. ✅ Maintained Cerebras Cloud API integration and retry logic",
+    "  4. ✅ Added full tool support while keeping Cerebras-specific features",
+    "",
+    "Files changed:",
+    "  - claude-cerebras: Now uses cerebras_tools_proxy.py",
+    "  - cerebras_tools_proxy.py: New tool-enabled Cerebras proxy (NEW FILE)",
+    "",
+    "Cerebras-specific features maintained:",
+    "  - Rate limiting and retry logic for 429 errors",
+    "  - Exponential backoff for failed requests",
+    "  - API key validation and error handling",
+    "  - OpenAI ↔ Anthropic format conversion",
+    "  - qwen-3-coder-480b model integration",
+    "",
+])
+
+SUCCESS_BLOCK = "\n".join([
+    "🎉 RED/GREEN CYCLE: ✅ COMPLETE SUCCESS!",
+    "",
+    "✅ Red test successfully demonstrated the problem",
+    "✅ Green test successfully verified the fix",
+    "",
+    "🔧 PROBLEM SOLVED:",
+    "  - claude-cerebras can now execute tools (bash, file creation, etc.)",
+    "  - Files are actually created, not just returned as code text",
+    "  - Full Claude Code CLI compatibility with Cerebras 480B model",
+    "  - Zero infrastructure costs (pay-per-token)",
+    "  - Massive 480B parameter model with tool execution",
+    "",
+    "🧠 CEREBRAS ADVANTAGES:",
+    "  - Largest available model (480B parameters)",
+    "  - No GPU infrastructure required",
+    "  - Pay only for what you use",
+    "  - Built-in rate limiting and retry handling",
+    "  - Fast inference with high-quality outputs",
+    "",
+    "🚀 READY FOR DEPLOYMENT:",
+    "  - Set CEREBRAS_API_KEY environment variable",
+    "  - Run ./claude-cerebras to start tool-enabled proxy",
+    "  - Test with: claude 'Create a file called test.txt'",
+    "  - Verify actual file creation on the filesystem",
+    "  - Enjoy 480B model with full tool capabilities!",
+])
+
+NEXT_STEPS_BLOCK = "\n".join([
+    "",
+    "🔍 Next steps:",
+    "  - Review test output above",
+    "  - Check Cerebras API key configuration",
+    "  - Verify all changes were applied correctly",
+    "  - Ensure dependencies are installed (fastapi, uvicorn, requests)",
+])
+
+COMPARISON_BLOCK = "\n".join([
+    "\n" + "=" * 80,
+    "🏁 CEREBRAS RED/GREEN TEST CYCLE COMPLETE",
+    "=" * 80,
+    "",
+    "💡 CLAUDE INTEGRATION COMPARISON:",
+    "=" * 50,
+    "",
+    "Now BOTH integrations support full tool execution:",
+    "",
+    "🌐 claude-vast (vast.ai):",
+    "  ✅ Fixed with vast_tools_proxy.py",
+    "  ✅ 30B qwen3-coder model",
+    "  ✅ ~$0.50/hour + caching",
+    "  ✅ Full GPU control",
+    "  ✅ Tools: bash, file creation, editing",
+    "",
+    "🧠 claude-cerebras (Cerebras Cloud):",
+    "  ✅ Fixed with cerebras_tools_proxy.py",
+    "  ✅ 480B qwen-3-coder model",
+    "  ✅ Pay-per-token pricing",
+    "  ✅ Zero infrastructure",
+    "  ✅ Tools: bash, file creation, editing",
+    "",
+    "🎯 USERS CAN NOW CHOOSE:",
+    "  - Cost optimization: claude-vast (caching + GPU control)",
+    "  - Maximum capability: claude-cerebras (480B model)",
+    "  - Both provide full Claude Code CLI tool execution!",
+])
 
 def main():
     """Run the complete red/green test cycle for Cerebras"""
     
-    print("🧠 CLAUDE-CEREBRAS TOOL EXECUTION: RED/GREEN TEST CYCLE")
-    print("="*80)
-    print()
-    print("This demonstrates the complete fix for claude-cerebras tool execution:")
-    print("  🔴 RED TEST: Shows the original broken behavior")
-    print("  🔧 FIX: Implementation of tool-enabled Cerebras proxy")
-    print("  🟢 GREEN TEST: Shows the fixed behavior")
-    print()
-    print("Problem: claude-cerebras couldn't create files or execute tools")
-    print("Solution: Replace cerebras_proxy_simple.py with cerebras_tools_proxy.py")
-    print()
-    print("🧠 Cerebras Advantages after fix:")
-    print("  - 480B parameter qwen-3-coder model (massive scale)")
-    print("  - Pay-per-token pricing (no infrastructure costs)")
-    print("  - Full tool execution (bash, file creation, editing)")
-    print("  - Zero setup required (just need API key)")
-    print("  - Built-in rate limiting and retry logic")
-    print()
-    
-    # Step 1: Red Test (Demonstrate the problem)
-    print("STEP 1: Demonstrating the problem...")
-    red_success = run_test_script("test_claude_cerebras_tools_red.py", 
-                                 "RED TEST - Demonstrating claude-cerebras tool limitations")
+    sys.stdout.write(HEADER_BLOCK + "\n")
+    sys.stdout.flush()
     
-    print(f"\n🔴 RED TEST RESULT: {'✅ PASSED' if red_success else '❌ FAILED'}")
-    print("The red test should PASS by successfully demonstrating the limitation.")
+    # Both scripts run concurrently; their reports print in order below
+    (red_success, red_report), (green_success, green_report) = asyncio.run(run_red_and_green())
     
-    # Step 2: Show the fix
-    print(f"\n{'='*80}")
-    print("🔧 THE CEREBRAS FIX HAS BEEN IMPLEMENTED")
-    print(f"{'='*80}")
-    print()
-    print("Key changes made:")
-    print("  1. ✅ Created cerebras_tools_proxy.py (tool-enabled Cerebras proxy)")
-    print("  2. ✅ Modified claude-cerebras to use cerebras_tools_proxy.py") 
-    print("  3. ✅ Maintained Cerebras Cloud API integration and retry logic")
-    print("  4. ✅ Added full tool support while keeping Cerebras-specific features")
-    print()
-    print("Files changed:")
-    print("  - claude-cerebras: Now uses cerebras_tools_proxy.py")
-    print("  - cerebras_tools_proxy.py: New tool-enabled Cerebras proxy (NEW FILE)")
-    print()
-    print("Cerebras-specific features maintained:")
-    print("  - Rate limiting and retry logic for 429 errors")
-    print("  - Exponential backoff for failed requests")
-    print("  - API key validation and error handling")
-    print("  - OpenAI ↔ Anthropic format conversion")
-    print("  - qwen-3-coder-480b model integration")
-    print()
-    
-    time.sleep(2)  # Brief pause for readability
-    
-    # Step 3: Green Test (Demonstrate the fix)
-    print("STEP 2: Demonstrating the fix...")
-    green_success = run_test_script("test_claude_cerebras_tools_green.py",
-                                   "GREEN TEST - Verifying claude-cerebras tool execution fix")
-    
-    print(f"\n🟢 GREEN TEST RESULT: {'✅ PASSED' if green_success else '❌ FAILED'}")
-    print("The green test should PASS by verifying the fix works correctly.")
-    
-    # Final Summary
-    print(f"\n{'='*80}")
-    print("📊 FINAL SUMMARY - CEREBRAS INTEGRATION")
-    print(f"{'='*80}")
+    # The rest of the report is assembled and written in one go
+    out = [
+        # Step 1: Red Test (Demonstrate the problem)
+        "STEP 1: Demonstrating the problem...",
+        red_report,
+        f"\n🔴 RED TEST RESULT: {'✅ PASSED' if red_success else '❌ FAILED'}",
+        "The red test should PASS by successfully demonstrating the limitation.",
+        # Step 2: Show the fix
+        FIX_BLOCK,
+        # Step 3: Green Test (Demonstrate the fix)
+        "STEP 2: Demonstrating the fix...",
+        green_report,
+        f"\n🟢 GREEN TEST RESULT: {'✅ PASSED' if green_success else '❌ FAILED'}",
+        "The green test should PASS by verifying the fix works correctly.",
+        # Final Summary
+        "\n" + "=" * 80,
+        "📊 FINAL SUMMARY - CEREBRAS INTEGRATION",
+        "=" * 80,
+    ]
     
     if red_success and green_success:
-        print("🎉 RED/GREEN CYCLE: ✅ COMPLETE SUCCESS!")
-        print()
-        print("✅ Red test successfully demonstrated the problem")
-        print("✅ Green test successfully verified the fix")
-        print()
-        print("🔧 PROBLEM SOLVED:")
-        print("  - claude-cerebras can now execute tools (bash, file creation, etc.)")
-        print("  - Files are actually created, not just returned as code text")
-        print("  - Full Claude Code CLI compatibility with Cerebras 480B model")
-        print("  - Zero infrastructure costs (pay-per-token)")
-        print("  - Massive 480B parameter model with tool execution")
-        print()
-        print("🧠 CEREBRAS ADVANTAGES:")
-        print("  - Largest available model (480B parameters)")
-        print("  - No GPU infrastructure required")
-        print("  - Pay only for what you use")
-        print("  - Built-in rate limiting and retry handling")
-        print("  - Fast inference with high-quality outputs")
-        print()
-        print("🚀 READY FOR DEPLOYMENT:")
-        print("  - Set CEREBRAS_API_KEY environment variable")
-        print("  - Run ./claude-cerebras to start tool-enabled proxy")
-        print("  - Test with: claude 'Create a file called test.txt'")
-        print("  - Verify actual file creation on the filesystem")
-        print("  - Enjoy 480B model with full tool capabilities!")
-        
+        out.append(SUCCESS_BLOCK)
     else:
-        print("⚠️  RED/GREEN CYCLE: Issues detected")
-        print()
+        out += ["⚠️  RED/GREEN CYCLE: Issues detected", ""]
         if not red_success:
-            print("❌ Red test failed - couldn't demonstrate the problem")
+            out.append("❌ Red test failed - couldn't demonstrate the problem")
         if not green_success:
-            print("❌ Green test failed - fix may not be working correctly")
-        print()
-        print("🔍 Next steps:")
-        print("  - Review test output above")
-        print("  - Check Cerebras API key configuration")
-        print("  - Verify all changes were applied correctly")
-        print("  - Ensure dependencies are installed (fastapi, uvicorn, requests)")
-    
-    print(f"\n{'='*80}")
-    print("🏁 CEREBRAS RED/GREEN TEST CYCLE COMPLETE")
-    print(f"{'='*80}")
+            out.append("❌ Green test failed - fix may not be working correctly")
+        out.append(NEXT_STEPS_BLOCK)
     
-    # Show comparison with vast.ai solution
-    print()
-    print("💡 CLAUDE INTEGRATION COMPARISON:")
-    print("=" * 50)
-    print()
-    print("Now BOTH integrations support full tool execution:")
-    print()
-    print("🌐 claude-vast (vast.ai):")
-    print("  ✅ Fixed with vast_tools_proxy.py")
-    print("  ✅ 30B qwen3-coder model")
-    print("  ✅ ~$0.50/hour + caching")
-    print("  ✅ Full GPU control")
-    print("  ✅ Tools: bash, file creation, editing")
-    print()
-    print("🧠 claude-cerebras (Cerebras Cloud):")
-    print("  ✅ Fixed with cerebras_tools_proxy.py")
-    print("  ✅ 480B qwen-3-coder model")
-    print("  ✅ Pay-per-token pricing")
-    print("  ✅ Zero infrastructure")
-    print("  ✅ Tools: bash, file creation, editing")
-    print()
-    print("🎯 USERS CAN NOW CHOOSE:")
-    print("  - Cost optimization: claude-vast (caching + GPU control)")
-    print("  - Maximum capability: claude-cerebras (480B model)")
-    print("  - Both provide full Claude Code CLI tool execution!")
+    # Closing banner plus the comparison with the vast.ai solution
+    out.append(COMPARISON_BLOCK)
+    sys.stdout.write("\n".join(out) + "\n")
+    sys.stdout.flush()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -7,14 +7,48 @@ and can actually execute file creation and other tools.
 """
 
 import subprocess
+import sys
 import os
 import time
 import json
 import tempfile
 import requests
 import threading
+import re
+import mmap
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 
+from proxy_introspect import ThreadBufferedStdout, analyze, run_buffered
+
+# Every token the source inspections look for, matched in one scan; the
+# lookahead lets overlapping tokens ("def bash(" and "bash(") both count
+FEATURE_TOKENS = (
+    "ClaudeCodeTools", "def bash(", "bash(", "str_replace_editor", "write_file",
+    "cerebras.ai", "retry_with_backoff", "429", "qwen-3-coder-480b", "CEREBRAS_API_KEY",
+)
+FEATURE_RE = re.compile("(?=(" + "|".join(map(re.escape, FEATURE_TOKENS)) + "))")
+
+@lru_cache(maxsize=None)
+def read_source(path):
+    """Read a file once per run; the tests below only inspect, never write"""
+    return Path(path).read_text()
+
+@lru_cache(maxsize=None)
+def source_features(path):
+    """The FEATURE_TOKENS present in a file"""
+    return frozenset(FEATURE_RE.findall(read_source(path)))
+
+def file_contains(path, *needles):
+    """Whether each byte string occurs in a file, searched through mmap
+    instead of reading and decoding the whole file"""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return [False] * len(needles)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return [mm.find(needle) != -1 for needle in needles]
+
 def test_cerebras_tools_proxy_directly():
     """
     GREEN TEST: Test the Cerebras tool-enabled proxy directly
@@ -28,23 +62,22 @@ def test_cerebras_tools_proxy_directly():
     # Test the new cerebras_tools_proxy.py
     proxy_file = "cerebras_tools_proxy.py"
     
-    if not os.path.exists(proxy_file):
+    # Check the proxy has tool support
+    try:
+        found = source_features(proxy_file)
+    except FileNotFoundError:
         print(f"❌ {proxy_file} not found")
         return False
     
     print(f"✅ Found Cerebras tool-enabled proxy: {proxy_file}")
     
-    # Check the proxy has tool support
-    with open(proxy_file, "r") as f:
-        proxy_content = f.read()
-    
     print("🔍 Analyzing Cerebras tool-enabled proxy:")
     
-    has_tools = "ClaudeCodeTools" in proxy_content
-    has_bash = "def bash(" in proxy_content
-    has_file_tools = "str_replace_editor" in proxy_content
-    has_write_file = "write_file" in proxy_content
-    has_cerebras_api = "cerebras.ai" in proxy_content
+    has_tools = "ClaudeCodeTools" in found
+    has_bash = "def bash(" in found
+    has_file_tools = "str_replace_editor" in found
+    has_write_file = "write_file" in found
+    has_cerebras_api = "cerebras.ai" in found
     
     print(f"  ✅ Has ClaudeCodeTools class: {has_tools}")
     print(f"  ✅ Has bash execution: {has_bash}")
@@ -69,19 +102,17 @@ def test_claude_cerebras_script_fix():
     # Check claude-cerebras script
     claude_cerebras_file = "./claude-cerebras"
     
-    if not os.path.exists(claude_cerebras_file):
+    # Check if it now uses the tools-enabled proxy
+    try:
+        uses_tools_proxy, uses_simple_proxy = file_contains(
+            claude_cerebras_file, b"cerebras_tools_proxy.py", b"cerebras_proxy_simple.py"
+        )
+    except FileNotFoundError:
         print(f"❌ {claude_cerebras_file} not found")
         return False
     
-    with open(claude_cerebras_file, "r") as f:
-        claude_cerebras_content = f.read()
-    
     print("🔍 Analyzing fixed claude-cerebras script:")
     
-    # Check if it now uses the tools-enabled proxy
-    uses_tools_proxy = "cerebras_tools_proxy.py" in claude_cerebras_content
-    uses_simple_proxy = "cerebras_proxy_simple.py" in claude_cerebras_content
-    
     print(f"  ✅ Uses tool-enabled proxy: {uses_tools_proxy}")
     print(f"  ⚠️  Still references simple proxy: {uses_simple_proxy}")
     
@@ -100,28 +131,30 @@ def test_cerebras_proxy_comparison():
     print("=" * 40)
     
     # Check cerebras_proxy_simple.py (old)
-    if os.path.exists("cerebras_proxy_simple.py"):
-        with open("cerebras_proxy_simple.py", "r") as f:
-            simple_content = f.read()
+    try:
+        info = analyze("cerebras_proxy_simple.py")
         
         print("📄 cerebras_proxy_simple.py (OLD):")
-        print(f"   Lines: {len(simple_content.splitlines())}")
-        print(f"   Has ClaudeCodeTools: {'ClaudeCodeTools' in simple_content}")
-        print(f"   Has bash tool: {'bash(' in simple_content}")
-        print(f"   Has file tools: {'str_replace_editor' in simple_content}")
+        print(f"   Lines: {info.lines}")
+        print(f"   Has ClaudeCodeTools: {info.has_tools}")
+        print(f"   Has bash tool: {info.has_bash}")
+        print(f"   Has file tools: {info.has_file_tools}")
         print(f"   Purpose: API format conversion only")
+    except FileNotFoundError:
+        pass
     
     # Check cerebras_tools_proxy.py (new)
-    if os.path.exists("cerebras_tools_proxy.py"):
-        with open("cerebras_tools_proxy.py", "r") as f:
-            tools_content = f.read()
+    try:
+        info = analyze("cerebras_tools_proxy.py")
         
         print("📄 cerebras_tools_proxy.py (NEW):")
-        print(f"   Lines: {len(tools_content.splitlines())}")
-        print(f"   Has ClaudeCodeTools: {'ClaudeCodeTools' in tools_content}")
-        print(f"   Has bash tool: {'bash(' in tools_content}")
-        print(f"   Has file tools: {'str_replace_editor' in tools_content}")
+        print(f"   Lines: {info.lines}")
+        print(f"   Has ClaudeCodeTools: {info.has_tools}")
+        print(f"   Has bash tool: {info.has_bash}")
+        print(f"   Has file tools: {info.has_file_tools}")
         print(f"   Purpose: Full tool execution + API conversion")
+    except FileNotFoundError:
+        pass
     
     return True
 
@@ -141,7 +174,7 @@ def test_end_to_end_simulation():
     print("  5. Cerebras 480B model provides intelligent responses ✅")
     
     # Create a test scenario
-    test_file = f"cerebras_green_test_{int(time.time())}.txt"
+    test_file = f"cerebras_green_test_{int(time.time())}_{os.getpid()}_{threading.get_ident()}.txt"
     test_content = "This file was created by the Cerebras tool-enabled proxy!"
     
     print(f"\n📝 Simulated file creation test:")
@@ -150,29 +183,27 @@ def test_end_to_end_simulation():
     
     # Simulate what the tool-enabled proxy would do
     try:
-        with open(test_file, 'w') as f:
-            f.write(test_content)
+        Path(test_file).write_text(test_content)
         
-        # Verify file exists
-        if os.path.exists(test_file):
-            with open(test_file, 'r') as f:
-                actual_content = f.read()
-            
-            if actual_content == test_content:
-                print("  ✅ File created successfully with correct content")
-                
-                # Clean up
-                os.remove(test_file)
-                print("  ✅ Test file cleaned up")
-                
-                return True
-            else:
-                print(f"  ❌ File content mismatch: {actual_content}")
-                return False
-        else:
+        # Read straight back; a missing file raises instead of needing exists()
+        try:
+            actual_content = Path(test_file).read_text()
+        except FileNotFoundError:
             print("  ❌ File was not created")
             return False
-            
+        
+        if actual_content != test_content:
+            print(f"  ❌ File content mismatch: {actual_content}")
+            return False
+        
+        print("  ✅ File created successfully with correct content")
+        
+        # Clean up
+        Path(test_file).unlink()
+        print("  ✅ Test file cleaned up")
+        
+        return True
+        
     except Exception as e:
         print(f"  ❌ File creation failed: {e}")
         return False
@@ -208,33 +239,32 @@ def test_cerebras_specific_features():
     print("\n🟢 GREEN TEST: Cerebras-specific features maintained")
     print("=" * 60)
     
-    if os.path.exists("cerebras_tools_proxy.py"):
-        with open("cerebras_tools_proxy.py", "r") as f:
-            content = f.read()
-        
-        print("🔍 Checking Cerebras-specific features:")
-        
-        # Check for Cerebras API integration
-        has_cerebras_url = "cerebras.ai" in content
-        has_retry_logic = "retry_with_backoff" in content
-        has_rate_limiting = "429" in content
-        has_qwen_model = "qwen-3-coder-480b" in content
-        has_api_key_check = "CEREBRAS_API_KEY" in content
-        
-        print(f"  ✅ Cerebras API URL: {has_cerebras_url}")
-        print(f"  ✅ Retry logic: {has_retry_logic}")
-        print(f"  ✅ Rate limiting handling: {has_rate_limiting}")
-        print(f"  ✅ Qwen 480B model: {has_qwen_model}")
-        print(f"  ✅ API key validation: {has_api_key_check}")
-        
-        if all([has_cerebras_url, has_retry_logic, has_rate_limiting, has_qwen_model]):
-            print("  ✅ All Cerebras-specific features maintained")
-            return True
-        else:
-            print("  ❌ Some Cerebras-specific features missing")
-            return False
+    try:
+        found = source_features("cerebras_tools_proxy.py")
+    except FileNotFoundError:
+        return False
+    
+    print("🔍 Checking Cerebras-specific features:")
+    
+    # Check for Cerebras API integration
+    has_cerebras_url = "cerebras.ai" in found
+    has_retry_logic = "retry_with_backoff" in found
+    has_rate_limiting = "429" in found
+    has_qwen_model = "qwen-3-coder-480b" in found
+    has_api_key_check = "CEREBRAS_API_KEY" in found
     
-    return False
+    print(f"  ✅ Cerebras API URL: {has_cerebras_url}")
+    print(f"  ✅ Retry logic: {has_retry_logic}")
+    print(f"  ✅ Rate limiting handling: {has_rate_limiting}")
+    print(f"  ✅ Qwen 480B model: {has_qwen_model}")
+    print(f"  ✅ API key validation: {has_api_key_check}")
+    
+    if all([has_cerebras_url, has_retry_logic, has_rate_limiting, has_qwen_model]):
+        print("  ✅ All Cerebras-specific features maintained")
+        return True
+    else:
+        print("  ❌ Some Cerebras-specific features missing")
+        return False
 
 if __name__ == "__main__":
     print("🧪 GREEN TEST SUITE: Claude-Cerebras Tool Execution Fixed")
@@ -250,14 +280,18 @@ if __name__ == "__main__":
         ("Cerebras-Specific Features", test_cerebras_specific_features),
     ]
     
-    results = []
-    for test_name, test_func in tests:
-        try:
-            result = test_func()
+    # The tests share no state, so their file reads overlap; output is
+    # replayed in the original order once each finishes
+    sys.stdout = ThreadBufferedStdout(sys.stdout)
+    with ThreadPoolExecutor(max_workers=len(tests)) as executor:
+        futures = [(test_name, executor.submit(run_buffered, test_name, test_func))
+                   for test_name, test_func in tests]
+        results = []
+        for test_name, future in futures:
+            result, output = future.result()
+            sys.stdout.write(output)
             results.append((test_name, result))
-        except Exception as e:
-            print(f"❌ {test_name} failed with exception: {e}")
-            results.append((test_name, False))
+    sys.stdout = sys.stdout.stream
     
     # Show comparison
     compare_before_after()
@@ -11,8 +11,24 @@ import os
 import time
 import json
 import tempfile
+import re
+import mmap
 from pathlib import Path
 
+from proxy_introspect import analyze
+
+# Any sign of tool support, checked in one scan ("tool" in any case)
+TOOL_HINT_RE = re.compile(rb"str_replace_editor|bash|ClaudeCodeTools|(?i:tool)")
+
+def file_contains(path, *needles):
+    """Whether each byte string occurs in a file, searched through mmap
+    instead of reading and decoding the whole file"""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return [False] * len(needles)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return [mm.find(needle) != -1 for needle in needles]
+
 def test_claude_cerebras_tool_limitation():
     """
     RED TEST: Shows claude-cerebras cannot create files
@@ -60,18 +76,19 @@ def test_claude_cerebras_tool_limitation():
         return False
     
     # Check what proxy claude-cerebras uses
-    with open("claude-cerebras", "r") as f:
-        claude_cerebras_content = f.read()
+    uses_simple_proxy, uses_cerebras_proxy = file_contains(
+        claude_cerebras_path, b"cerebras_proxy_simple.py", b"cerebras_proxy.py"
+    )
     
     print("🔍 Analysis of claude-cerebras script:")
     
-    if "cerebras_proxy_simple.py" in claude_cerebras_content:
+    if uses_simple_proxy:
         print("✅ claude-cerebras uses cerebras_proxy_simple.py")
         print("❌ cerebras_proxy_simple.py has NO TOOL EXECUTION capabilities")
     else:
         print("❓ Unclear which proxy is used by claude-cerebras")
     
-    if "cerebras_proxy.py" in claude_cerebras_content:
+    if uses_cerebras_proxy:
         print("✅ claude-cerebras references cerebras_proxy.py")
     else:
         print("❌ claude-cerebras does NOT use a tool-enabled proxy")
@@ -82,15 +99,9 @@ def test_claude_cerebras_tool_limitation():
     
     # Check if cerebras_proxy_simple has tool support
     if os.path.exists("cerebras_proxy_simple.py"):
-        with open("cerebras_proxy_simple.py", "r") as f:
-            cerebras_proxy_content = f.read()
-        
-        has_tools = (
-            "str_replace_editor" in cerebras_proxy_content or
-            "bash" in cerebras_proxy_content or
-            "ClaudeCodeTools" in cerebras_proxy_content or
-            "tool" in cerebras_proxy_content.lower()
-        )
+        with open("cerebras_proxy_simple.py", "rb") as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            has_tools = TOOL_HINT_RE.search(mm) is not None
         
         if has_tools:
             print("✅ cerebras_proxy_simple.py has tool support")
@@ -132,37 +143,34 @@ def test_cerebras_proxy_comparison():
     
     # Check cerebras_proxy_simple.py
     if os.path.exists("cerebras_proxy_simple.py"):
-        with open("cerebras_proxy_simple.py", "r") as f:
-            simple_content = f.read()
+        info = analyze("cerebras_proxy_simple.py")
         
         print("📄 cerebras_proxy_simple.py:")
-        print(f"   Lines: {len(simple_content.splitlines())}")
-        print(f"   Has ClaudeCodeTools: {'ClaudeCodeTools' in simple_content}")
-        print(f"   Has bash tool: {'bash(' in simple_content}")
-        print(f"   Has file tools: {'str_replace_editor' in simple_content}")
+        print(f"   Lines: {info.lines}")
+        print(f"   Has ClaudeCodeTools: {info.has_tools}")
+        print(f"   Has bash tool: {info.has_bash}")
+        print(f"   Has file tools: {info.has_file_tools}")
         print(f"   Purpose: API format conversion only")
     
     # Check if there's a regular cerebras_proxy.py
     if os.path.exists("cerebras_proxy.py"):
-        with open("cerebras_proxy.py", "r") as f:
-            proxy_content = f.read()
+        info = analyze("cerebras_proxy.py")
         
         print("📄 cerebras_proxy.py:")
-        print(f"   Lines: {len(proxy_content.splitlines())}")
-        print(f"   Has ClaudeCodeTools: {'ClaudeCodeTools' in proxy_content}")
-        print(f"   Has bash tool: {'bash(' in proxy_content}")
-        print(f"   Has file tools: {'str_replace_editor' in proxy_content}")
+        print(f"   Lines: {info.lines}")
+        print(f"   Has ClaudeCodeTools: {info.has_tools}")
+        print(f"   Has bash tool: {info.has_bash}")
+        print(f"   Has file tools: {info.has_file_tools}")
     
     # Compare with our tool-enabled proxy
     if os.path.exists("vast_tools_proxy.py"):
-        with open("vast_tools_proxy.py", "r") as f:
-            tools_content = f.read()
+        info = analyze("vast_tools_proxy.py")
         
         print("📄 vast_tools_proxy.py (for comparison):")
-        print(f"   Lines: {len(tools_content.splitlines())}")
-        print(f"   Has ClaudeCodeTools: {'ClaudeCodeTools' in tools_content}")
-        print(f"   Has bash tool: {'bash(' in tools_content}")
-        print(f"   Has file tools: {'str_replace_editor' in tools_content}")
+        print(f"   Lines: {info.lines}")
+        print(f"   Has ClaudeCodeTools: {info.has_tools}")
+        print(f"   Has bash tool: {info.has_bash}")
+        print(f"   Has file tools: {info.has_file_tools}")
         print(f"   Purpose: Full tool execution + API conversion")
 
 def test_claude_cerebras_architecture():
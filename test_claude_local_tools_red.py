@@ -11,8 +11,27 @@ import os
 import time
 import json
 import tempfile
+import re
+from functools import lru_cache
 from pathlib import Path
 
+# Every token the source inspections look for, matched in one scan
+FEATURE_TOKENS = (
+    "ClaudeCodeTools", "bash(", "str_replace_editor",
+    "LM_STUDIO", "chat/completions", "lm-studio", "os.getenv",
+)
+FEATURE_RE = re.compile("|".join(map(re.escape, FEATURE_TOKENS)))
+
+@lru_cache(maxsize=None)
+def read_source(path):
+    """Read a file once per run; the tests below only inspect, never write"""
+    return Path(path).read_text()
+
+@lru_cache(maxsize=None)
+def source_features(path):
+    """The FEATURE_TOKENS present in a file"""
+    return frozenset(FEATURE_RE.findall(read_source(path)))
+
 def test_claude_local_previous_limitation():
     """
     RED TEST: Shows how claude-local PREVIOUSLY couldn't create files
@@ -44,8 +63,7 @@ def test_claude_local_previous_limitation():
         return False
     
     # Check what approach claude-local now uses
-    with open("claude-local", "r") as f:
-        claude_local_content = f.read()
+    claude_local_content = read_source("claude-local")
     
     print("🔍 Analysis of claude-local script:")
     
@@ -76,13 +94,12 @@ def test_claude_local_previous_limitation():
     
     # Check if local_tools_proxy.py exists and has tools
     if os.path.exists("local_tools_proxy.py"):
-        with open("local_tools_proxy.py", "r") as f:
-            tools_proxy_content = f.read()
+        found = source_features("local_tools_proxy.py")
         
         has_tools = (
-            "ClaudeCodeTools" in tools_proxy_content and
-            "bash(" in tools_proxy_content and
-            "str_replace_editor" in tools_proxy_content
+            "ClaudeCodeTools" in found and
+            "bash(" in found and
+            "str_replace_editor" in found
         )
         
         if has_tools:
@@ -164,16 +181,15 @@ def test_local_specific_features():
     print("=" * 50)
     
     if os.path.exists("local_tools_proxy.py"):
-        with open("local_tools_proxy.py", "r") as f:
-            content = f.read()
+        found = source_features("local_tools_proxy.py")
         
         print("🔍 Checking local LM Studio-specific features:")
         
         # Check for LM Studio integration
-        has_lm_studio = "LM_STUDIO" in content
-        has_openai_format = "chat/completions" in content
-        has_auth = "lm-studio" in content
-        has_env_config = "os.getenv" in content
+        has_lm_studio = "LM_STUDIO" in found
+        has_openai_format = "chat/completions" in found
+        has_auth = "lm-studio" in found
+        has_env_config = "os.getenv" in found
         
         print(f"  ✅ LM Studio integration: {has_lm_studio}")
         print(f"  ✅ OpenAI API format: {has_openai_format}")
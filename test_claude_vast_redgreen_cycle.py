@@ -76,7 +76,8 @@ def main():
     print("  - vast_tools_proxy.py: New tool-enabled proxy (NEW FILE)")
     print()
     
-    time.sleep(2)  # Brief pause for readability
+    if sys.stdout.isatty():
+        time.sleep(2)  # Brief pause for readability; skipped when piped (CI)
     
     # Step 3: Green Test (Demonstrate the fix)
     print("STEP 2: Demonstrating the fix...")
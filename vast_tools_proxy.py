@@ -10,28 +10,89 @@ import sys
 import json
 import time
 import hashlib
-import traceback
-from typing import Dict, List, Any, Optional, Union
+import struct
+import sqlite3
+import threading
+import asyncio
+import queue
+import logging
+import logging.handlers
+from typing import Dict, List, Any, Optional, Union, AsyncIterator
 from datetime import datetime
+from contextlib import asynccontextmanager
+from functools import lru_cache
 
 # Core dependencies only
 from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 import uvicorn
-import requests
+import httpx
 
 # Import base tool classes
-from claude_tools_base import ToolExecutionMixin
+from claude_tools_base import (
+    ToolExecutionMixin, RequestCoalescer, ORJSONResponse, next_id,
+    json_bytes, json_loads, sse_event, text_delta
+)
 
 # Optional Redis dependency
 try:
     import redis
+    from redis.backoff import ExponentialBackoff
+    from redis.retry import Retry
     HAS_REDIS = True
 except ImportError:
     HAS_REDIS = False
     print("⚠️  Redis not available - running without cache")
 
+# Optional native hashing/serialization for cache keys
+try:
+    import blake3
+    HAS_BLAKE3 = True
+except ImportError:
+    HAS_BLAKE3 = False
+
+try:
+    import cbor2
+    HAS_CBOR2 = True
+except ImportError:
+    HAS_CBOR2 = False
+
+# Optional zstd compression for cached response bodies
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+# Optional tiktoken for token counts when Ollama doesn't report usage
+try:
+    import tiktoken
+    HAS_TIKTOKEN = True
+except ImportError:
+    HAS_TIKTOKEN = False
+
+# Optional semantic cache dependencies
+try:
+    import numpy as np
+    from sentence_transformers import SentenceTransformer
+    HAS_SENTENCE_TRANSFORMERS = True
+except ImportError:
+    HAS_SENTENCE_TRANSFORMERS = False
+
+# Request handlers only enqueue log records; a background listener thread,
+# started by each worker's lifespan, formats them and writes to stderr.
+# Per-request logs are DEBUG.
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+_log_queue = queue.SimpleQueue()
+_log_listener = logging.handlers.QueueListener(_log_queue, logging.StreamHandler())
+logger = logging.getLogger("vast_tools_proxy")
+logger.setLevel(LOG_LEVEL)
+logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+logger.propagate = False
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
 print("🚀 Starting Tool-Enabled Vast.ai Proxy Server...")
 print("=" * 50)
 
@@ -40,94 +101,446 @@ REDIS_HOST = os.getenv('REDIS_HOST')
 REDIS_PORT = int(os.getenv('REDIS_PORT', 6379))
 REDIS_PASSWORD = os.getenv('REDIS_PASSWORD')
 API_PORT = int(os.getenv('API_PORT', 8000))
+WEB_WORKERS = int(os.getenv('WEB_WORKERS', 4))
 OLLAMA_HOST = os.getenv('OLLAMA_HOST', 'localhost:11434')
+OLLAMA_MODEL = os.getenv('OLLAMA_MODEL', 'qwen3-coder')
+
+# Load and pin the model at startup, then re-pin periodically in case
+# Ollama restarted and dropped it (0 disables the periodic re-pin)
+OLLAMA_WARMUP = os.getenv('OLLAMA_WARMUP', '1') == '1'
+OLLAMA_KEEPALIVE_INTERVAL = float(os.getenv('OLLAMA_KEEPALIVE_INTERVAL', 240))
+
+# enabled: read + write, readonly: read only, replay: read only and never
+# call Ollama on a miss, disabled: bypass both cache tiers
+CACHE_MODE = os.getenv('CACHE_MODE', 'enabled').lower()
+CACHE_READ = CACHE_MODE in ('enabled', 'readonly', 'replay')
+CACHE_WRITE = CACHE_MODE == 'enabled'
+CACHE_TTL = 86400  # 24 hours, in Redis and the disk tier alike
+
+# Opt-in SQLite tier behind Redis
+DISK_CACHE = os.getenv('DISK_CACHE', '0') == '1'
+CACHE_DB_PATH = os.path.expanduser(os.getenv('CACHE_DB_PATH', '~/.cache/llm_selfhost/responses.db'))
+
+# Prompts longer than this skip both cache tiers: they almost never repeat
+# and would push out entries that do
+CACHE_MAX_PROMPT_CHARS = int(os.getenv('CACHE_MAX_PROMPT_CHARS', 50_000))
+
+HEALTH_CACHE_TTL = float(os.getenv('HEALTH_CACHE_TTL', 3))
+
+# Comma-separated origins allowed to call the proxy from a browser
+CORS_ORIGINS = [origin.strip() for origin in os.getenv('CORS_ORIGINS', '').split(',') if origin.strip()]
+
+# Completions arriving within this window are dispatched to Ollama together (0 posts directly)
+COALESCE_WINDOW_MS = float(os.getenv('COALESCE_WINDOW_MS', 0))
+COALESCE_MAX_BATCH = int(os.getenv('COALESCE_MAX_BATCH', 8))
+
+# Near-duplicate prompt matching (needs sentence-transformers + Redis Stack)
+SEMANTIC_CACHE = os.getenv('SEMANTIC_CACHE', '0') == '1'
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv('SEMANTIC_CACHE_THRESHOLD', '0.95'))
+SEMANTIC_INDEX = "claude_sem_idx"
+
+# Shared async client: Ollama calls don't block the event loop and reuse
+# keep-alive connections (transport retries cover connect failures)
+http_client = httpx.AsyncClient(
+    base_url=f"http://{OLLAMA_HOST}",
+    timeout=httpx.Timeout(300, connect=5),
+    limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+    transport=httpx.AsyncHTTPTransport(retries=3)
+)
 
 # Redis setup
 USE_REDIS_CACHE = bool(HAS_REDIS and REDIS_HOST and REDIS_PASSWORD)
 redis_client = None
+REDIS_CONNECTION_ERRORS = (redis.ConnectionError, redis.TimeoutError) if HAS_REDIS else ()
 
-if USE_REDIS_CACHE:
+# Set while Redis is unreachable: cache calls skip it and a background
+# thread pings until it answers again
+REDIS_RETRY_INTERVAL = 5
+_redis_degraded = threading.Event()
+_redis_pinger_lock = threading.Lock()
+_redis_pinger = None
+
+def redis_available() -> bool:
+    return USE_REDIS_CACHE and not _redis_degraded.is_set()
+
+def _ping_until_healthy() -> None:
+    while True:
+        time.sleep(REDIS_RETRY_INTERVAL)
+        try:
+            redis_client.ping()
+        except Exception:
+            continue
+        _redis_degraded.clear()
+        logger.info("✅ Redis reconnected: %s:%s", REDIS_HOST, REDIS_PORT)
+        return
+
+def mark_redis_degraded(error: Exception) -> None:
+    """Stop using Redis and start the background reconnect probe"""
+    global _redis_pinger
+    _redis_degraded.set()
+    with _redis_pinger_lock:
+        if _redis_pinger is None or not _redis_pinger.is_alive():
+            logger.warning("⚠️  Redis unreachable, bypassing cache: %s", error)
+            _redis_pinger = threading.Thread(target=_ping_until_healthy, daemon=True)
+            _redis_pinger.start()
+
+def redis_call(command: str, *args) -> Any:
+    """Run a Redis command unless Redis is degraded (None when skipped)"""
+    if not redis_available():
+        return None
+    try:
+        return getattr(redis_client, command)(*args)
+    except REDIS_CONNECTION_ERRORS as e:
+        mark_redis_degraded(e)
+        return None
+
+def init_redis() -> None:
+    """Open the Redis pool; called from lifespan so only workers connect"""
+    global redis_client
+    if not USE_REDIS_CACHE:
+        logger.info("ℹ️  Redis cache disabled")
+        return
+    # Pooled TLS connections, health-checked when idle; the short backoff
+    # keeps a dead server from stalling requests before degrading
+    redis_pool = redis.ConnectionPool(
+        connection_class=redis.SSLConnection,
+        host=REDIS_HOST,
+        port=REDIS_PORT,
+        password=REDIS_PASSWORD,
+        max_connections=int(os.getenv('REDIS_POOL_SIZE', 64)),
+        health_check_interval=30,
+        retry=Retry(ExponentialBackoff(cap=0.5, base=0.05), 3),
+        retry_on_error=[redis.ConnectionError, redis.TimeoutError],
+        socket_timeout=5
+    )
+    redis_client = redis.Redis(connection_pool=redis_pool)
     try:
-        redis_client = redis.Redis(
-            host=REDIS_HOST,
-            port=REDIS_PORT,
-            password=REDIS_PASSWORD,
-            ssl=True,
-            decode_responses=True,
-            socket_timeout=5
-        )
-        # Test connection
         redis_client.ping()
-        print(f"✅ Redis connected: {REDIS_HOST}:{REDIS_PORT}")
+        logger.info("✅ Redis connected: %s:%s", REDIS_HOST, REDIS_PORT)
+    except Exception as e:
+        logger.error("❌ Redis connection failed: %s", e)
+        mark_redis_degraded(e)
+
+# Persistent second tier behind Redis; survives Redis eviction and restarts
+disk_cache = None
+disk_cache_lock = threading.Lock()
+
+def init_disk_cache() -> None:
+    global disk_cache
+    if not (DISK_CACHE and CACHE_READ):
+        return
+    try:
+        os.makedirs(os.path.dirname(CACHE_DB_PATH), exist_ok=True)
+        disk_cache = sqlite3.connect(CACHE_DB_PATH, check_same_thread=False, isolation_level=None)
+        disk_cache.execute("PRAGMA journal_mode=WAL")
+        disk_cache.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, model TEXT, created REAL)"
+        )
+        if CACHE_WRITE:
+            disk_cache.execute("DELETE FROM responses WHERE created <= ?", (time.time() - CACHE_TTL,))
+        logger.info("✅ Disk cache: %s (mode: %s)", CACHE_DB_PATH, CACHE_MODE)
+    except Exception as e:
+        logger.warning("⚠️  Disk cache unavailable: %s", e)
+        disk_cache = None
+
+# Semantic tier: HNSW vector index over cached responses in Redis; the
+# embedding model is loaded by each worker's lifespan, not at import
+embedder = None
+
+def init_semantic_cache() -> None:
+    global embedder
+    if not (SEMANTIC_CACHE and redis_available() and CACHE_READ and HAS_SENTENCE_TRANSFORMERS):
+        return
+    try:
+        model = SentenceTransformer('all-MiniLM-L6-v2')
+        try:
+            redis_client.execute_command(
+                "FT.CREATE", SEMANTIC_INDEX, "ON", "HASH", "PREFIX", "1", "claude_sem:",
+                "SCHEMA", "scope", "TAG",
+                "emb", "VECTOR", "HNSW", "6",
+                "TYPE", "FLOAT32",
+                "DIM", model.get_sentence_embedding_dimension(),
+                "DISTANCE_METRIC", "COSINE"
+            )
+        except redis.ResponseError as e:
+            if "already exists" not in str(e).lower():
+                raise
+        embedder = model
+        logger.info("✅ Semantic cache enabled (threshold %s)", SEMANTIC_CACHE_THRESHOLD)
     except Exception as e:
-        print(f"❌ Redis connection failed: {e}")
-        print("⚠️  Continuing without cache")
-        USE_REDIS_CACHE = False
-        redis_client = None
-else:
-    print("ℹ️  Redis cache disabled")
+        logger.warning("⚠️  Semantic cache unavailable: %s", e)
 
 class VastToolsProxy(ToolExecutionMixin):
     """Vast.ai proxy with Redis caching and tool execution"""
     
     def __init__(self):
         super().__init__()
-        print(f"🔧 Vast Tools Proxy initialized with session: {self.tools.session_id}")
+        logger.info("🔧 Vast Tools Proxy initialized with session: %s", self.tools.session_id)
+
+coalescer = RequestCoalescer(http_client, COALESCE_WINDOW_MS / 1000, COALESCE_MAX_BATCH)
+
+async def pin_model() -> None:
+    """Empty generate with keep_alive=-1: loads the model and keeps it resident"""
+    try:
+        response = await http_client.post(
+            "/api/generate",
+            json={"model": OLLAMA_MODEL, "prompt": "", "keep_alive": -1}
+        )
+        if response.status_code == 200:
+            logger.info("🔥 Model %s loaded and pinned", OLLAMA_MODEL)
+        else:
+            logger.warning("⚠️  Model warmup failed: %s - %s", response.status_code, response.text)
+    except httpx.HTTPError as e:
+        logger.warning("⚠️  Model warmup failed: %s", e)
+
+async def keep_model_warm() -> None:
+    await pin_model()
+    while OLLAMA_KEEPALIVE_INTERVAL > 0:
+        await asyncio.sleep(OLLAMA_KEEPALIVE_INTERVAL)
+        await pin_model()
+
+# Wall-clock values for response payloads, refreshed in the background
+# instead of formatted per request
+_clock = {"iso": datetime.now().isoformat(), "unix": int(time.time())}
+
+async def tick_clock() -> None:
+    while True:
+        await asyncio.sleep(0.5)
+        _clock["iso"] = datetime.now().isoformat()
+        _clock["unix"] = int(time.time())
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Connections and models are set up per worker here rather than at
+    # import, which the uvicorn supervisor process also runs
+    _log_listener.start()
+    await asyncio.to_thread(init_redis)
+    await asyncio.to_thread(init_disk_cache)
+    await asyncio.to_thread(init_semantic_cache)
+    clock = asyncio.create_task(tick_clock())
+    # In the background so the server accepts requests while the model loads
+    warmup = asyncio.create_task(keep_model_warm()) if OLLAMA_WARMUP else None
+    yield
+    clock.cancel()
+    if warmup is not None:
+        warmup.cancel()
+    await coalescer.aclose()
+    await http_client.aclose()
+    if disk_cache is not None:
+        disk_cache.close()
+    _log_listener.stop()
 
 # Initialize FastAPI app
-app = FastAPI(title="Tool-Enabled Vast.ai Proxy", version="1.0.0")
-
-# Add CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+app = FastAPI(
+    title="Tool-Enabled Vast.ai Proxy",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
+# Claude Code calls the proxy server-side, so CORS is only added for
+# explicitly listed browser origins
+if CORS_ORIGINS:
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=CORS_ORIGINS,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+# Compress large JSON bodies; Starlette >= 0.46 (see requirements.txt)
+# leaves text/event-stream untouched
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=1)
+
 # Initialize proxy with tools
 proxy = VastToolsProxy()
 
-def create_cache_key(messages: List[Dict]) -> str:
-    """Create a cache key from messages"""
+def create_cache_key(model: str, messages: List[Dict], max_tokens: Optional[int],
+                     temperature: Optional[float]) -> str:
+    """Create a cache key from everything that affects the generation
+    
+    BLAKE3 over canonical CBOR when available, otherwise BLAKE2b over sorted
+    compact JSON; both are deterministic for equal requests. Unset
+    parameters (Ollama's defaults) hash as -1.
+    """
     try:
-        # Serialize messages to consistent string
-        messages_str = json.dumps(messages, sort_keys=True)
-        return hashlib.md5(messages_str.encode()).hexdigest()
+        h = blake3.blake3() if HAS_BLAKE3 else hashlib.blake2b(digest_size=32)
+        h.update(model.encode())
+        h.update(struct.pack(
+            "<qq",
+            -1 if max_tokens is None else int(max_tokens),
+            -1 if temperature is None else round(float(temperature) * 1e6)
+        ))
+        if HAS_CBOR2:
+            h.update(cbor2.dumps(messages, canonical=True))
+        else:
+            h.update(json.dumps(messages, sort_keys=True, separators=(',', ':')).encode())
+        return h.hexdigest()
     except Exception as e:
-        print(f"⚠️  Cache key generation failed: {e}")
+        logger.warning("⚠️  Cache key generation failed: %s", e)
         return str(time.time())
 
-def get_cached_response(cache_key: str) -> Optional[Dict]:
-    """Get cached response if available"""
-    if not USE_REDIS_CACHE:
+# Cached bodies are zstd frames when zstandard is installed; reads detect the
+# frame magic, so plain JSON written without it still loads
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+if HAS_ZSTD:
+    zstd_compressor = zstandard.ZstdCompressor(level=3)
+    zstd_decompressor = zstandard.ZstdDecompressor()
+
+def pack_cached(value: bytes) -> bytes:
+    return zstd_compressor.compress(value) if HAS_ZSTD else value
+
+def unpack_cached(raw: Union[str, bytes]) -> bytes:
+    """JSON bytes of a stored body (zstd frame, plain bytes or an old TEXT row)"""
+    if isinstance(raw, str):
+        return raw.encode()
+    if raw[:4] == ZSTD_MAGIC:
+        return zstd_decompressor.decompress(raw)
+    return raw
+
+def prompt_chars(messages: List[Dict]) -> int:
+    return sum(len(content_text(msg.get("content", ""))) for msg in messages)
+
+def get_cached_response(cache_key: str) -> Optional[bytes]:
+    """Get the cached response body from Redis, falling back to the disk cache
+    
+    Returns the JSON bytes so buffered hits can be sent without a
+    decode/re-encode round trip.
+    """
+    if not CACHE_READ:
         return None
     
-    try:
-        cached = redis_client.get(f"claude_cache:{cache_key}")
-        if cached:
-            print("🎯 Cache hit!")
-            return json.loads(cached)
-    except Exception as e:
-        print(f"⚠️  Cache read error: {e}")
+    if redis_available():
+        try:
+            cached = redis_call("get", f"claude_cache:{cache_key}")
+            if cached:
+                logger.debug("🎯 Cache hit!")
+                return unpack_cached(cached)
+        except Exception as e:
+            logger.warning("⚠️  Cache read error: %s", e)
+    
+    if disk_cache is not None:
+        try:
+            now = time.time()
+            with disk_cache_lock:
+                row = disk_cache.execute(
+                    "SELECT value, created FROM responses WHERE key = ? AND created > ?",
+                    (cache_key, now - CACHE_TTL)
+                ).fetchone()
+            if row:
+                logger.debug("🎯 Disk cache hit!")
+                if CACHE_WRITE:
+                    # Repopulate the hot tier for what is left of the entry's TTL
+                    ttl = int(row[1] + CACHE_TTL - now)
+                    if ttl > 0:
+                        redis_call("setex", f"claude_cache:{cache_key}", ttl, row[0])
+                return unpack_cached(row[0])
+        except Exception as e:
+            logger.warning("⚠️  Disk cache read error: %s", e)
     
     return None
 
-def cache_response(cache_key: str, response: Dict) -> None:
-    """Cache response with TTL"""
-    if not USE_REDIS_CACHE:
+def cache_response(cache_key: str, response: Dict, model: str = OLLAMA_MODEL,
+                   scope: Optional[str] = None, vector: Optional[bytes] = None) -> None:
+    """Cache response in Redis and the disk cache (CACHE_TTL in both)
+    
+    With a prompt embedding, the semantic index entry is written in the
+    same Redis pipeline as the exact entry.
+    """
+    if not CACHE_WRITE:
         return
     
+    value = pack_cached(json_bytes(response))
+    
+    if redis_available():
+        try:
+            pipe = redis_client.pipeline(transaction=False)
+            pipe.setex(f"claude_cache:{cache_key}", CACHE_TTL, value)
+            if vector is not None:
+                sem_key = f"claude_sem:{cache_key}"
+                pipe.hset(sem_key, mapping={"scope": scope, "emb": vector, "response": value})
+                pipe.expire(sem_key, CACHE_TTL)
+            pipe.execute()
+            logger.debug("💾 Response cached")
+        except REDIS_CONNECTION_ERRORS as e:
+            mark_redis_degraded(e)
+        except Exception as e:
+            logger.warning("⚠️  Cache write error: %s", e)
+    
+    if disk_cache is not None:
+        try:
+            with disk_cache_lock:
+                disk_cache.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, model, created) VALUES (?, ?, ?, ?)",
+                    (cache_key, value, model, time.time())
+                )
+        except Exception as e:
+            logger.warning("⚠️  Disk cache write error: %s", e)
+
+def semantic_scope(model: str, max_tokens: Optional[int], temperature: Optional[float]) -> str:
+    """Tag that keeps semantic matches within one model and parameter set"""
+    params = json.dumps([model, max_tokens, temperature], separators=(',', ':'))
+    return hashlib.sha256(params.encode()).hexdigest()[:16]
+
+# Prefixes for the common roles, built once instead of per message
+ROLE_PREFIX = {role: f"{role}: " for role in ("system", "user", "assistant")}
+
+def content_text(content: Union[str, List[Dict[str, Any]], None]) -> str:
+    """Plain text of an Anthropic content field (string or block list)"""
+    if type(content) is str:
+        return content
+    if type(content) is list:
+        return " ".join([block.get("text", "") for block in content if type(block) is dict])
+    return "" if content is None else str(content)
+
+def messages_text(messages: List[Dict]) -> str:
+    """Flatten a conversation into "role: text" lines for embedding and token counts"""
+    return "\n".join([
+        (ROLE_PREFIX.get(msg.get("role")) or f"{msg.get('role', '')}: ") + content_text(msg.get("content", ""))
+        for msg in messages
+    ])
+
+@lru_cache(maxsize=None)
+def token_encoding():
+    return tiktoken.get_encoding("cl100k_base")
+
+def count_tokens(text: str) -> int:
+    """BPE token count (cl100k); ~4 chars per token without tiktoken"""
+    if HAS_TIKTOKEN:
+        return len(token_encoding().encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+def anthropic_usage(usage: Dict[str, Any], messages: List[Dict], content: str) -> Dict[str, int]:
+    """Map OpenAI-style usage to Anthropic's, counting locally what Ollama omitted"""
+    return {
+        "input_tokens": usage.get("prompt_tokens") or count_tokens(messages_text(messages)),
+        "output_tokens": usage.get("completion_tokens") or count_tokens(content)
+    }
+
+def embed_text(text: str) -> bytes:
+    return embedder.encode(text, normalize_embeddings=True).astype(np.float32).tobytes()
+
+def get_semantic_response(scope: str, vector: bytes) -> Optional[bytes]:
+    """Return the nearest cached response in scope if it is similar enough"""
     try:
-        redis_client.setex(
-            f"claude_cache:{cache_key}",
-            86400,  # 24 hours TTL
-            json.dumps(response)
+        result = redis_call(
+            "execute_command",
+            "FT.SEARCH", SEMANTIC_INDEX,
+            f"(@scope:{{{scope}}})=>[KNN 1 @emb $vec AS dist]",
+            "PARAMS", "2", "vec", vector,
+            "RETURN", "2", "dist", "response",
+            "DIALECT", "2"
         )
-        print("💾 Response cached")
+        if result and result[0]:
+            fields = dict(zip(result[2][::2], result[2][1::2]))
+            similarity = 1 - float(fields[b"dist"])
+            if similarity >= SEMANTIC_CACHE_THRESHOLD:
+                logger.debug("🎯 Semantic cache hit! (similarity %.3f)", similarity)
+                return unpack_cached(fields[b"response"])
     except Exception as e:
-        print(f"⚠️  Cache write error: {e}")
+        logger.warning("⚠️  Semantic cache read error: %s", e)
+    return None
 
 # Use methods from the proxy instance
 def should_use_tools(content: str) -> bool:
@@ -136,36 +549,227 @@ def should_use_tools(content: str) -> bool:
 def extract_tool_requests(content: str) -> List[Dict]:
     return proxy.extract_tool_requests(content)
 
-def execute_tools(tool_requests: List[Dict]) -> str:
-    return proxy.execute_tools(tool_requests)
+async def execute_tools(tool_requests: List[Dict]) -> str:
+    # Tools block (subprocess, file I/O); keep them off the event loop
+    return await proxy.aexecute_tools(tool_requests)
 
-@app.get("/health")
-async def health_check():
-    """Health check endpoint"""
+def stream_start_events(message_id: str) -> str:
+    return sse_event("message_start", {
+        "type": "message_start",
+        "message": {
+            "id": message_id,
+            "type": "message",
+            "role": "assistant",
+            "content": [],
+            "model": "claude-3-5-sonnet-20241022",
+            "stop_reason": None,
+            "stop_sequence": None,
+            "usage": {"input_tokens": 0, "output_tokens": 0}
+        }
+    }) + sse_event("content_block_start", {
+        "type": "content_block_start",
+        "index": 0,
+        "content_block": {"type": "text", "text": ""}
+    })
+
+def stream_stop_events(output_tokens: int) -> str:
+    return sse_event("content_block_stop", {
+        "type": "content_block_stop",
+        "index": 0
+    }) + sse_event("message_delta", {
+        "type": "message_delta",
+        "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+        "usage": {"output_tokens": output_tokens}
+    }) + sse_event("message_stop", {"type": "message_stop"})
+
+# Generations in progress by cache key; identical concurrent requests wait
+# for the first one's message instead of generating it again
+_inflight: Dict[str, asyncio.Future] = {}
+
+# Longest a request waits on another one's generation (the Ollama read
+# timeout) before generating itself
+INFLIGHT_WAIT_TIMEOUT = 300
+
+def claim_inflight(cache_key: str) -> Optional[asyncio.Future]:
+    """Register as the generation identical requests wait on (None if one already is)"""
+    if cache_key in _inflight:
+        return None
+    inflight = asyncio.get_running_loop().create_future()
+    _inflight[cache_key] = inflight
+    return inflight
+
+async def wait_inflight(cache_key: str) -> Optional[Dict]:
+    """Message of an identical generation already running, if any finishes in time"""
+    pending = _inflight.get(cache_key)
+    if pending is None:
+        return None
+    try:
+        return await asyncio.wait_for(asyncio.shield(pending), INFLIGHT_WAIT_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.warning("⚠️  In-flight generation timed out, generating again")
+        if _inflight.get(cache_key) is pending:
+            del _inflight[cache_key]
+        return None
+
+def finish_inflight(cache_key: str, inflight: Optional[asyncio.Future], response: Optional[Dict]) -> None:
+    """Release waiters with the finished message (None tells them to generate)"""
+    if inflight is None:
+        return
+    if _inflight.get(cache_key) is inflight:
+        del _inflight[cache_key]
+    if not inflight.done():
+        inflight.set_result(response)
+
+async def stream_cached_response(cached_response: Dict) -> AsyncIterator[str]:
+    """Replay a cached message as a single-delta event stream"""
+    yield stream_start_events(cached_response.get("id") or next_id("msg_"))
+    yield text_delta(cached_response["content"][0]["text"])
+    yield stream_stop_events(cached_response.get("usage", {}).get("output_tokens", 0))
+
+async def stream_ollama_response(ollama_request: Dict[str, Any], cache_key: str,
+                                 scope: Optional[str], semantic_vector: Optional[bytes],
+                                 cacheable: bool = True,
+                                 share: bool = False) -> AsyncIterator[str]:
+    """Relay Ollama's OpenAI-style SSE chunks as Anthropic stream events
     
-    # Check Ollama connection
-    ollama_status = "unknown"
+    Once the last chunk is in, tools run on the full text, their output is
+    sent as a trailing delta and the assembled message is cached and handed
+    to any identical requests waiting on this one.
+    
+    The in-flight entry is claimed only once the body is being iterated, so
+    a response that is never started (client gone first) leaves none behind.
+    """
+    inflight = claim_inflight(cache_key) if share else None
     try:
-        response = requests.get(f"http://{OLLAMA_HOST}/api/tags", timeout=5)
-        if response.status_code == 200:
-            ollama_status = "healthy"
-        else:
-            ollama_status = f"error_{response.status_code}"
-    except Exception as e:
-        ollama_status = f"unreachable"
+        message_id = next_id("msg_")
+        yield stream_start_events(message_id)
+        
+        parts = []
+        usage = {}
+        try:
+            async with http_client.stream(
+                "POST", "/v1/chat/completions",
+                content=json_bytes({**ollama_request, "stream": True, "stream_options": {"include_usage": True}}),
+                headers={"Content-Type": "application/json"}
+            ) as response:
+                if response.status_code != 200:
+                    error_text = (await response.aread()).decode(errors="replace")
+                    logger.error("❌ Ollama error: %s - %s", response.status_code, error_text)
+                    yield sse_event("error", {
+                        "type": "error",
+                        "error": {"type": "api_error", "message": error_text}
+                    })
+                    return
+            
+                async for line in response.aiter_lines():
+                    if not line.startswith("data: "):
+                        continue
+                    data = line[6:].strip()
+                    if data == "[DONE]":
+                        break
+                    try:
+                        chunk = json_loads(data)
+                    except json.JSONDecodeError:
+                        continue
+                
+                    usage = chunk.get("usage") or usage
+                    choices = chunk.get("choices") or [{}]
+                    text = choices[0].get("delta", {}).get("content")
+                    if text:
+                        parts.append(text)
+                        yield text_delta(text)
+        except httpx.HTTPError as e:
+            logger.error("❌ Ollama stream failed: %s", e)
+            yield sse_event("error", {
+                "type": "error",
+                "error": {"type": "api_error", "message": f"Ollama service unavailable: {str(e)}"}
+            })
+            return
+        
+        content = "".join(parts)
+        tools_ran = False
+        if should_use_tools(content):
+            tool_requests = extract_tool_requests(content)
+            if tool_requests:
+                tool_results = await execute_tools(tool_requests)
+                content += tool_results
+                tools_ran = True
+                yield text_delta(tool_results)
+                logger.debug("✅ Tools executed: %d operations", len(tool_requests))
+        
+        usage = anthropic_usage(usage, ollama_request["messages"], content)
+        yield stream_stop_events(usage["output_tokens"])
+        
+        anthropic_response = {
+            "id": message_id,
+            "type": "message",
+            "role": "assistant",
+            "content": [{"type": "text", "text": content}],
+            "model": "claude-3-5-sonnet-20241022",
+            "stop_reason": "end_turn",
+            "usage": usage
+        }
+        # Tool output is only true for this run; replaying it would skip the tools
+        if not tools_ran:
+            if cacheable:
+                cache_response(cache_key, anthropic_response, scope=scope, vector=semantic_vector)
+            finish_inflight(cache_key, inflight, anthropic_response)
+        logger.debug("✅ Stream complete (%d chars)", len(content))
+    finally:
+        finish_inflight(cache_key, inflight, None)
+
+# Last backend probe, shared by every /health caller until it expires
+_health_cache = {"ts": float("-inf"), "ollama": "unknown", "redis": "disabled"}
+_health_lock = asyncio.Lock()
+
+async def probe_backends() -> Dict[str, Any]:
+    """Ollama and Redis status, probed at most once per HEALTH_CACHE_TTL
+    
+    Concurrent callers after expiry wait on one probe instead of each
+    hitting Ollama.
+    """
+    if time.monotonic() - _health_cache["ts"] < HEALTH_CACHE_TTL:
+        return _health_cache
     
-    # Check Redis
-    redis_status = "disabled"
-    if USE_REDIS_CACHE:
+    async with _health_lock:
+        if time.monotonic() - _health_cache["ts"] < HEALTH_CACHE_TTL:
+            return _health_cache
+        
+        # Check Ollama connection
         try:
-            redis_client.ping()
-            redis_status = "healthy"
-        except:
-            redis_status = "error"
+            response = await http_client.get("/api/tags", timeout=5)
+            if response.status_code == 200:
+                _health_cache["ollama"] = "healthy"
+            else:
+                _health_cache["ollama"] = f"error_{response.status_code}"
+        except Exception:
+            _health_cache["ollama"] = "unreachable"
+        
+        # Check Redis (the reconnect thread owns pings while degraded)
+        if USE_REDIS_CACHE:
+            try:
+                if _redis_degraded.is_set():
+                    _health_cache["redis"] = "degraded"
+                elif redis_call("ping"):
+                    _health_cache["redis"] = "healthy"
+                else:
+                    _health_cache["redis"] = "degraded"
+            except Exception:
+                _health_cache["redis"] = "error"
+        
+        _health_cache["ts"] = time.monotonic()
+    return _health_cache
+
+@app.get("/health")
+async def health_check():
+    """Health check endpoint"""
+    status = await probe_backends()
+    ollama_status = status["ollama"]
+    redis_status = status["redis"]
     
-    return JSONResponse({
+    return ORJSONResponse({
         "status": "healthy",
-        "timestamp": datetime.now().isoformat(),
+        "timestamp": _clock["iso"],
         "vast_tools_proxy": "active",
         "tools_enabled": True,
         "components": {
@@ -182,20 +786,20 @@ async def health_check():
 @app.get("/v1/models")
 async def list_models():
     """List available models"""
-    return JSONResponse({
+    return ORJSONResponse({
         "object": "list",
         "data": [
             {
                 "id": "claude-3-5-sonnet-20241022",
                 "object": "model",
-                "created": int(time.time()),
+                "created": _clock["unix"],
                 "owned_by": "anthropic",
                 "type": "text"
             },
             {
-                "id": "qwen3-coder",
+                "id": OLLAMA_MODEL,
                 "object": "model", 
-                "created": int(time.time()),
+                "created": _clock["unix"],
                 "owned_by": "qwen",
                 "type": "text"
             }
@@ -206,18 +810,52 @@ async def list_models():
 async def create_message(request: Request):
     """Create message with tool execution support"""
     try:
-        request_data = await request.json()
+        request_data = json_loads(await request.body())
         messages = request_data.get("messages", [])
         
-        print(f"📨 Request: {len(messages)} messages")
+        logger.debug("📨 Request: %d messages", len(messages))
+        
+        # Only forwarded when the client sets them, so Ollama's defaults apply otherwise
+        max_tokens = request_data.get("max_tokens")
+        temperature = request_data.get("temperature")
+        stream = bool(request_data.get("stream"))
         
         # Create cache key
-        cache_key = create_cache_key(messages)
+        cache_key = create_cache_key(OLLAMA_MODEL, messages, max_tokens, temperature)
+        
+        # Oversized prompts bypass both cache tiers
+        cacheable = prompt_chars(messages) <= CACHE_MAX_PROMPT_CHARS
         
         # Check cache first
-        cached_response = get_cached_response(cache_key)
+        cached_response = get_cached_response(cache_key) if cacheable else None
+        
+        # Then near-duplicates of earlier prompts
+        scope = None
+        semantic_vector = None
+        if cached_response is None and cacheable and embedder is not None:
+            scope = semantic_scope(OLLAMA_MODEL, max_tokens, temperature)
+            semantic_vector = await asyncio.to_thread(embed_text, messages_text(messages))
+            cached_response = get_semantic_response(scope, semantic_vector)
+        
         if cached_response:
-            return JSONResponse(cached_response)
+            if stream:
+                return StreamingResponse(stream_cached_response(json_loads(cached_response)), media_type="text/event-stream")
+            return Response(content=cached_response, media_type="application/json")
+        
+        if CACHE_MODE == 'replay':
+            raise HTTPException(status_code=404, detail="Cache miss in replay mode")
+        
+        # Join an identical generation that is already running
+        inflight = None
+        if CACHE_READ:
+            shared = await wait_inflight(cache_key)
+            if shared is not None:
+                logger.debug("🔁 Joined in-flight generation")
+                if stream:
+                    return StreamingResponse(stream_cached_response(shared), media_type="text/event-stream")
+                return ORJSONResponse(shared)
+            if not stream:
+                inflight = claim_inflight(cache_key)
         
         # Forward to Ollama/Qwen
         try:
@@ -225,27 +863,40 @@ async def create_message(request: Request):
             enhanced_messages = proxy.add_tool_instructions_to_messages(messages)
             
             ollama_request = {
-                "model": "qwen3-coder",
+                "model": OLLAMA_MODEL,
                 "messages": enhanced_messages,
                 "stream": False
             }
+            if max_tokens is not None:
+                ollama_request["max_tokens"] = max_tokens
+            if temperature is not None:
+                ollama_request["temperature"] = temperature
+            
+            logger.debug("🔄 Forwarding to Ollama: %s", OLLAMA_HOST)
             
-            print(f"🔄 Forwarding to Ollama: {OLLAMA_HOST}")
+            if stream:
+                events = stream_ollama_response(ollama_request, cache_key, scope, semantic_vector,
+                                                cacheable, share=CACHE_READ)
+                return StreamingResponse(
+                    events,
+                    media_type="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+                )
             
-            response = requests.post(
-                f"http://{OLLAMA_HOST}/v1/chat/completions",
-                json=ollama_request,
-                timeout=120
+            response = await coalescer.post(
+                "/v1/chat/completions",
+                content=json_bytes(ollama_request),
+                headers={"Content-Type": "application/json"}
             )
             
             if response.status_code != 200:
                 raise HTTPException(status_code=response.status_code, detail=response.text)
             
-            ollama_response = response.json()
+            ollama_response = json_loads(response.content)
             
             # Convert to Anthropic format
             anthropic_response = {
-                "id": f"msg_{int(time.time())}",
+                "id": next_id("msg_"),
                 "type": "message",
                 "role": "assistant",
                 "content": [
@@ -256,48 +907,74 @@ async def create_message(request: Request):
                 ],
                 "model": "claude-3-5-sonnet-20241022",
                 "stop_reason": "end_turn",
-                "usage": ollama_response.get("usage", {})
+                "usage": anthropic_usage(
+                    ollama_response.get("usage", {}),
+                    enhanced_messages,
+                    ollama_response["choices"][0]["message"]["content"]
+                )
             }
             
             # Check if we should execute tools
             response_content = anthropic_response["content"][0]["text"]
+            tools_ran = False
             
             if should_use_tools(response_content):
-                print("🔧 Tool execution triggered")
+                logger.debug("🔧 Tool execution triggered")
                 
                 # Extract and execute tools
                 tool_requests = extract_tool_requests(response_content)
                 if tool_requests:
-                    tool_results = execute_tools(tool_requests)
+                    tool_results = await execute_tools(tool_requests)
                     
                     # Enhance response with tool results
                     enhanced_content = response_content + tool_results
                     anthropic_response["content"][0]["text"] = enhanced_content
-                    print(f"✅ Tools executed: {len(tool_requests)} operations")
+                    tools_ran = True
+                    logger.debug("✅ Tools executed: %d operations", len(tool_requests))
             
-            # Cache the response
-            cache_response(cache_key, anthropic_response)
+            # Cache the response; tool output is only true for this run and
+            # replaying it would skip the tools
+            if not tools_ran:
+                if cacheable:
+                    cache_response(cache_key, anthropic_response, scope=scope, vector=semantic_vector)
+                finish_inflight(cache_key, inflight, anthropic_response)
             
-            print(f"✅ Response ready ({len(response_content)} chars)")
-            return JSONResponse(anthropic_response)
+            logger.debug("✅ Response ready (%d chars)", len(response_content))
+            return ORJSONResponse(anthropic_response)
             
-        except requests.exceptions.RequestException as e:
-            print(f"❌ Ollama request failed: {e}")
+        except httpx.HTTPError as e:
+            logger.error("❌ Ollama request failed: %s", e)
             raise HTTPException(status_code=503, detail=f"Ollama service unavailable: {str(e)}")
+        finally:
+            finish_inflight(cache_key, inflight, None)
             
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"❌ Error processing request: {e}")
-        traceback.print_exc()
+        logger.exception("❌ Error processing request: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 if __name__ == "__main__":
     print("\n🚀 Tool-Enabled Vast.ai Proxy Server")
     print("=" * 40)
     print(f"🌐 Port: {API_PORT}")
-    print(f"🤖 Ollama: {OLLAMA_HOST}")
+    print(f"🤖 Ollama: {OLLAMA_HOST} ({OLLAMA_MODEL})")
     print(f"💾 Redis: {'Enabled' if USE_REDIS_CACHE else 'Disabled'}")
+    print(f"🗄️  Cache mode: {CACHE_MODE}")
     print(f"🔧 Tools: bash, str_replace_editor, write_file")
     print("\nReady for Claude Code CLI integration!")
     print("=" * 40)
     
-    uvicorn.run(app, host="0.0.0.0", port=API_PORT)
\ No newline at end of file
+    # Import string so each worker process builds its own clients and caches
+    uvicorn.run(
+        "vast_tools_proxy:app",
+        host="0.0.0.0",
+        port=API_PORT,
+        workers=WEB_WORKERS,
+        backlog=2048,
+        # uvloop/httptools when installed, asyncio/h11 otherwise
+        loop="auto",
+        http="auto",
+        log_level="warning",
+        access_log=False
+    )
\ No newline at end of file